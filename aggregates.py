@@ -0,0 +1,337 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+
+# Dimensions of the daily aggregate cube. Every chart on the Dashboard tab is a
+# sum of the cube's 'count' column over some of these, so date-range changes
+# only touch the cube, never the raw rows.
+CUBE_DIMENSIONS = [
+    'date', 'ticket_status', 'cf_tech_issue_category', 'cf_cf_tech_issue_category_sub-category',
+    'agent_name', 'cf_is_tech_issue', 'cf_knowledge_gap', 'has_jira']
+
+
+WEEK_LABEL_FORMAT = '%d-%m-%Y'
+MONTH_LABEL_FORMAT = '%m-%Y'
+
+# Buckets of the time-series charts, finest first, with their x-axis labels
+PERIOD_LABEL_FORMATS = {'day': '%d-%m-%Y', 'week': WEEK_LABEL_FORMAT, 'month': MONTH_LABEL_FORMAT}
+PERIOD_DAYS = {'day': 1, 'week': 7, 'month': 30.4}
+
+# Buckets of the Jira week/status chart, keyed by lower-cased ticket_status
+JIRA_STATUS_GROUPS = {'on hold': 'onhold', 'onhold': 'onhold', 'open': 'open', 'closed': 'closed', 'resolved': 'closed'}
+
+
+def week_start(timestamps):
+    """Monday 00:00 of the ISO week each timestamp falls in."""
+    days = timestamps.dt.normalize()
+    return days - pd.to_timedelta(days.dt.weekday, unit='D')
+
+def week_bounds(week_label):
+    """[start, end) of the week whose Monday is week_label (dd-mm-yyyy)."""
+    start = pd.to_datetime(week_label, format=WEEK_LABEL_FORMAT)
+    return start, start + pd.Timedelta(days=7)
+
+def month_bounds(month_label):
+    """[start, end) of the month month_label (mm-yyyy)."""
+    start = pd.to_datetime(month_label, format=MONTH_LABEL_FORMAT)
+    return start, start + pd.offsets.MonthBegin(1)
+
+def period_start(days, period):
+    """First day of the day/week/month bucket each (normalized) day falls in."""
+    if period == 'week':
+        return week_start(days)
+    if period == 'month':
+        return days.dt.to_period('M').dt.start_time
+    return days
+
+def choose_period(cube, max_points, periods=('day', 'week', 'month')):
+    """Finest of periods that keeps the cube's date span within about max_points buckets."""
+    if cube.empty:
+        return periods[0]
+    days = (cube['date'].iloc[-1] - cube['date'].iloc[0]).days + 1
+    for period in periods[:-1]:
+        if days / PERIOD_DAYS[period] <= max_points:
+            return period
+    return periods[-1]
+
+def iso_year(week_starts):
+    # The ISO year is the calendar year of the week's Thursday
+    return (week_starts + pd.Timedelta(days=3)).dt.year
+
+# Columns of the Insights tables and their CSV exports
+HIGH_AGE_COLUMNS = ['ticket_id', 'title', 'agent_name', 'age_hours']
+JIRA_TICKET_COLUMNS = ['ticket_id', 'ticket_status', 'cf_jira_link', 'agent_name', 'age_days']
+TOP_CUSTOMER_COLUMNS = ['Email', 'Ticket Count']
+
+# Open tickets older than this are listed as high ageing, unless the page asks
+# for another threshold
+HIGH_AGE_HOURS = float(os.environ.get('HIGH_AGE_HOURS', '72'))
+
+# Ticket statuses the ageing tables look at, lower-cased
+OPEN_STATUSES = ['open']
+JIRA_OPEN_STATUSES = ['open', 'onhold']
+
+# Per-day summaries the top customers table is merged from: 'exact' keeps
+# every (day, email) count, 'approximate' each day's TOP_N_SKETCH_SIZE largest
+TOP_N_MODES = ['exact', 'approximate']
+TOP_N_MODE = os.environ.get('TOP_N_MODE', 'exact')
+TOP_N_SKETCH_SIZE = int(os.environ.get('TOP_N_SKETCH_SIZE', '100'))
+
+_TIME_OF_DAY = re.compile(r'^\s*(\d{1,2}):(\d{2})\s*$')
+
+
+def has_jira_link(df):
+    links = df['cf_jira_link']
+    if isinstance(links.dtype, pd.CategoricalDtype):
+        # Test each distinct link once; missing links (code -1) pick the trailing False
+        linked = np.append(links.cat.categories.astype(str).str.strip() != '', False)
+        return pd.Series(linked[links.cat.codes.to_numpy()], index=links.index)
+    return links.notnull() & (links.astype(str).str.strip() != '')
+
+def _present(df, columns):
+    # Free-text columns such as title may still be on disk (Dataset.with_columns adds them)
+    return df[[col for col in columns if col in df]]
+
+def resolve_as_of(as_of_date=None, as_of_time=None):
+    """The time ages are measured at: as_of_date (yyyy-mm-dd) at as_of_time (HH:MM), or now.
+
+    Ages are never stored with the dataset; they are worked out from this
+    reference whenever a table is drawn. "Now" is rounded down to the minute,
+    so results cached for it stay valid for that minute.
+    """
+    if not as_of_date:
+        return pd.Timestamp.now().floor('min')
+    as_of = pd.Timestamp(as_of_date).normalize()
+    match = _TIME_OF_DAY.match(as_of_time or '')
+    if match and int(match.group(1)) < 24 and int(match.group(2)) < 60:
+        as_of += pd.Timedelta(hours=int(match.group(1)), minutes=int(match.group(2)))
+    return as_of
+
+def age_hours(created_at, as_of):
+    # Tickets created after as_of have no age yet
+    return ((as_of - created_at).dt.total_seconds() / 3600).where(created_at <= as_of)
+
+def high_age_tickets(df, as_of, threshold_hours=HIGH_AGE_HOURS):
+    # Open tickets older than threshold_hours at as_of, oldest first. Being
+    # older is a comparison of creation times, so only the tickets listed get
+    # an age worked out
+    cutoff = as_of - pd.Timedelta(hours=threshold_hours)
+    high_age = df[df['ticket_status'].str.lower().isin(OPEN_STATUSES) & (df['created_at'] < cutoff)]
+    high_age = high_age.sort_values('created_at', kind='stable')
+    return _present(high_age.assign(age_hours=age_hours(high_age['created_at'], as_of)), HIGH_AGE_COLUMNS)
+
+def jira_tickets(df, as_of):
+    # Open/on-hold tickets with a Jira link that existed at as_of, oldest first
+    jira = df[has_jira_link(df) & df['ticket_status'].str.lower().isin(JIRA_OPEN_STATUSES)
+              & (df['created_at'] <= as_of)]
+    jira = jira.sort_values('created_at', kind='stable')
+    jira = jira.assign(age_days=(age_hours(jira['created_at'], as_of) // 24).astype(int))
+    return _present(jira, JIRA_TICKET_COLUMNS)
+
+def _value_totals(values, weights=None):
+    # Rows (or the sum of weights) per value; categoricals in category order,
+    # so ties rank the same however the totals were reached
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy()
+        present = codes >= 0
+        totals = np.bincount(codes[present], None if weights is None else weights[present],
+                             minlength=len(values.cat.categories))
+        return pd.Series(totals.astype(np.int64), index=values.cat.categories)
+    if weights is None:
+        return values.value_counts(sort=False)
+    return pd.Series(weights).groupby(values.to_numpy(), sort=False).sum()
+
+def _top_customer_table(counts, n):
+    # A categorical counts every category, including those not in the rows
+    top = counts[counts > 0].nlargest(n).reset_index()
+    top.columns = TOP_CUSTOMER_COLUMNS
+    return top
+
+def top_customers(df, n=10):
+    return _top_customer_table(_value_totals(df['user_email']), n)
+
+def build_daily_counts(df, column='user_email'):
+    """Tickets per (day, value of column), sorted by day: exact per-day partial counts.
+
+    Any date range's counts are the sum of its days, so a top-N over the
+    range merges these instead of scanning the raw rows.
+    """
+    keys = pd.DataFrame({'date': df['created_at'].dt.normalize(), column: df[column]})
+    counts = keys.groupby(['date', column], observed=True, sort=False).size().reset_index(name='count')
+    return counts.sort_values('date', kind='stable').reset_index(drop=True)
+
+def daily_top(df, column='user_email', k=TOP_N_SKETCH_SIZE):
+    """The k largest of each day's build_daily_counts, sorted by day.
+
+    A heavy-hitters summary a fraction of the size of the exact one, which
+    is only held while this runs. Merged
+    over a date range its counts are lower bounds: a value loses at most the
+    (k+1)th largest count of every day it missed the cut on, so values that
+    are heavy on most days, the ones a top-N lists, come out (nearly) exact.
+    """
+    ranked = build_daily_counts(df, column).sort_values(['date', 'count'], ascending=[True, False], kind='stable')
+    return ranked.groupby('date', sort=False).head(k).reset_index(drop=True)
+
+def merged_top_customers(summary, start, end, n=10):
+    """top_customers of the tickets created in [start, end], from a per-day summary."""
+    days = slice_cube(summary, start, end)
+    return _top_customer_table(_value_totals(days['user_email'], days['count'].to_numpy()), n)
+
+def build_cube(df):
+    """Ticket counts per (day, status, category, ..., has_jira), sorted by day.
+
+    Each row also carries its ISO week start, so every weekly chart and
+    click handler buckets weeks the same way.
+    """
+    keys = pd.DataFrame({
+        'date': df['created_at'].dt.normalize(),
+        **{col: df[col] for col in CUBE_DIMENSIONS[1:-1]},
+        'has_jira': has_jira_link(df),
+    })
+    cube = (keys.groupby(CUBE_DIMENSIONS, observed=True, dropna=False, sort=False)
+            .size().reset_index(name='count'))
+    # Rows without a creation date can never fall inside a date range
+    cube = cube[cube['date'].notna()]
+    cube = cube.sort_values('date', kind='stable').reset_index(drop=True)
+    cube['week'] = week_start(cube['date'])
+    return cube
+
+def merge_cubes(cubes, df):
+    """Combine the cubes of consecutive chunks of df into the cube of df."""
+    cubes = [cube.astype({col: df[col].dtype for col in CUBE_DIMENSIONS[1:-1]}) for cube in cubes]
+    cube = (pd.concat(cubes, ignore_index=True)
+            .groupby(CUBE_DIMENSIONS, observed=True, dropna=False, sort=False)['count'].sum()
+            .reset_index())
+    cube = cube.sort_values('date', kind='stable').reset_index(drop=True)
+    cube['week'] = week_start(cube['date'])
+    return cube
+
+def update_cube(cube, removed, added, df):
+    """cube with the rows of removed taken out and those of added put in.
+
+    df is the resulting frame (for the column dtypes). Only the days that
+    removed or added touch are recomputed; every other day is kept as is.
+    """
+    removed_cube = build_cube(removed)
+    removed_cube['count'] = -removed_cube['count']
+    added_cube = build_cube(added)
+    touched = cube['date'].isin(pd.concat([removed_cube['date'], added_cube['date']]).unique())
+    changed = merge_cubes([cube[touched], removed_cube, added_cube], df)
+    kept = cube[~touched].astype({col: df[col].dtype for col in CUBE_DIMENSIONS[1:-1]})
+    cube = pd.concat([kept, changed[changed['count'] != 0]], ignore_index=True)
+    return cube.sort_values('date', kind='stable').reset_index(drop=True)
+
+def resolve_date_range(start_date, end_date, cube):
+    """Turn the DatePickerRange values into whole days [start, end], inclusive."""
+    start = pd.Timestamp(start_date).normalize() if start_date else cube['date'].min()
+    end = pd.Timestamp(end_date).normalize() if end_date else cube['date'].max()
+    return start, end
+
+def slice_cube(cube, start, end):
+    dates = cube['date'].to_numpy()
+    lo = dates.searchsorted(np.datetime64(start, 'ns'), side='left') if pd.notna(start) else 0
+    hi = dates.searchsorted(np.datetime64(end, 'ns'), side='right') if pd.notna(end) else len(dates)
+    return cube.iloc[lo:hi]
+
+def counts_by(cube, columns):
+    return cube.groupby(columns, observed=True)['count'].sum()
+
+def rows_in_range(df, start, end):
+    mask = df['created_at'].notna()
+    if pd.notna(start):
+        mask &= df['created_at'] >= start
+    if pd.notna(end):
+        mask &= df['created_at'] < end + pd.Timedelta(days=1)
+    return df[mask]
+
+
+# Chart data. Each function takes a (sliced) cube and returns the frame its
+# chart is drawn from.
+
+def _labelled_counts(cube, column, label_column):
+    counts = counts_by(cube, column)
+    frame = counts.reset_index(name='Count')
+    frame[label_column] = [f"{value} ({count})" for value, count in counts.items()]
+    return frame
+
+def tickets_by_date_status(cube, period='day'):
+    buckets = cube if period == 'day' else cube.assign(date=period_start(cube['date'], period))
+    tickets = counts_by(buckets, ['date', 'ticket_status']).reset_index(name='Tickets')
+    # Format date as dd-mm-yyyy (mm-yyyy for months) for display and sort in ascending order
+    tickets['date_formatted'] = tickets['date'].dt.strftime(PERIOD_LABEL_FORMATS[period])
+    tickets['period'] = period
+    tickets = tickets.sort_values('date')
+    # Legend labels carry the total count per status
+    totals = counts_by(cube, 'ticket_status')
+    tickets['status_label'] = tickets['ticket_status'].map(lambda s: f"{s} ({totals.get(s, 0)})").astype(object)
+    return tickets
+
+def status_counts(cube):
+    return _labelled_counts(cube, 'ticket_status', 'ticket_status_label')
+
+def tech_issue_counts(cube):
+    return _labelled_counts(cube, 'cf_is_tech_issue', 'cf_is_tech_issue_label')
+
+def knowledge_gap_counts(cube):
+    return _labelled_counts(cube, 'cf_knowledge_gap', 'cf_knowledge_gap_label')
+
+def _top(cube, column, names, n):
+    top = counts_by(cube, column).nlargest(n).reset_index()
+    top.columns = names
+    return top
+
+def top_categories(cube, n=10):
+    top = _top(cube, 'cf_tech_issue_category', ['Category', 'Count'], n)
+    top['CategoryLabel'] = [f"{c} ({count})" for c, count in zip(top['Category'], top['Count'])]
+    return top
+
+def top_subcategories(cube, n=10):
+    top = _top(cube, 'cf_cf_tech_issue_category_sub-category', ['Sub-Category', 'Count'], n)
+    top['SubCategoryLabel'] = [f"{c} ({count})" for c, count in zip(top['Sub-Category'], top['Count'])]
+    return top
+
+def agent_closed(cube, n=10):
+    closed = cube[cube['ticket_status'].astype(str).str.lower().str.contains('closed|resolved')]
+    return _top(closed, 'agent_name', ['Agent', 'Closed Tickets'], n)
+
+def week_counts(cube, period='week'):
+    buckets = cube if period == 'week' else cube.assign(week=period_start(cube['date'], period))
+    weeks = counts_by(buckets, 'week').reset_index(name='Tickets')
+    weeks = weeks.rename(columns={'week': 'week_start_date'})
+    if period == 'week':
+        weeks['year'] = iso_year(weeks['week_start_date'])
+    else:
+        weeks['year'] = weeks['week_start_date'].dt.year
+    # Label weeks by their Monday in dd-mm-yyyy format (months as mm-yyyy)
+    weeks['week_label'] = weeks['week_start_date'].dt.strftime(PERIOD_LABEL_FORMATS[period])
+    weeks['period'] = period
+    return weeks.sort_values('week_start_date')
+
+def last_4_weeks(cube):
+    weeks = week_counts(cube).tail(4).copy()
+    weeks['label'] = weeks['week_label']
+    return weeks
+
+def jira_week_status(cube):
+    """Weekly Jira ticket counts per status group plus a 'total' group."""
+    jira = cube[cube['has_jira']]
+    groups = jira['ticket_status'].astype(str).str.lower().map(JIRA_STATUS_GROUPS)
+    jira = jira.assign(status_group=groups)[groups.notna()]
+    by_group = jira.groupby(['week', 'status_group'])['count'].sum().reset_index(name='Count')
+    totals = jira.groupby('week')['count'].sum().reset_index(name='Count')
+    totals['status_group'] = 'total'
+
+    # Combine for plotting and sort by date
+    weekly = pd.concat([by_group, totals], ignore_index=True).sort_values('week', kind='stable')
+    weekly['week_label'] = weekly['week'].dt.strftime(WEEK_LABEL_FORMAT)
+    group_counts = weekly.groupby('status_group')['Count'].sum().to_dict()
+    weekly['status_label'] = weekly['status_group'].map(lambda s: f"{s.capitalize()} ({group_counts.get(s, 0)})")
+    return weekly
+
+def total_jira_tickets(cube):
+    jira = cube[cube['has_jira']]
+    in_group = jira['ticket_status'].astype(str).str.lower().map(JIRA_STATUS_GROUPS).notna()
+    return int(jira.loc[in_group, 'count'].sum())
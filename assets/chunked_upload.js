@@ -0,0 +1,86 @@
+// Resumable, chunked upload for large exports (served by uploads.py).
+//
+// The file is sent in CHUNK_BYTES slices with PUT /upload/<id>?offset=N; the id
+// is derived from the file, so picking the same file again after a dropped
+// connection resumes where the server left off. Once every byte is stored the
+// file is staged under its content key, which is handed to the 'pending-upload'
+// store for the dashboard's upload callback to ingest.
+(function () {
+    var CHUNK_BYTES = 8 * 1024 * 1024;
+    var MAX_ATTEMPTS = 5;
+
+    function setProps(id, props) {
+        window.dash_clientside.set_props(id, props);
+    }
+
+    function uploadId(file) {
+        var hash = 0;
+        for (var i = 0; i < file.name.length; i++) {
+            hash = (hash * 31 + file.name.charCodeAt(i)) | 0;
+        }
+        return ['f', file.size, file.lastModified, (hash >>> 0).toString(16)].join('-');
+    }
+
+    function showProgress(value, max, text) {
+        setProps('chunked-upload-progress', {value: value, max: max, style: {display: 'inline-block', width: '300px'}});
+        setProps('chunked-upload-status', {children: text});
+    }
+
+    function hideProgress(text) {
+        setProps('chunked-upload-progress', {style: {display: 'none'}});
+        setProps('chunked-upload-status', {children: text});
+    }
+
+    // Retries network errors and 5xx responses with a growing delay
+    async function send(method, url, body) {
+        for (var attempt = 1; ; attempt++) {
+            var response = null;
+            try {
+                response = await fetch(url, {method: method, body: body});
+            } catch (e) {
+                response = null;
+            }
+            if (response && response.status < 500) {
+                return response;
+            }
+            if (attempt >= MAX_ATTEMPTS) {
+                throw new Error('Upload failed' + (response ? ' (HTTP ' + response.status + ')' : ''));
+            }
+            await new Promise(function (resolve) { setTimeout(resolve, 1000 * attempt); });
+        }
+    }
+
+    async function upload(file) {
+        var base = '/upload/' + uploadId(file);
+        var received = (await (await send('GET', base)).json()).received;
+        while (received < file.size) {
+            showProgress(received, file.size,
+                'Uploading ' + file.name + ': ' + Math.floor(100 * received / file.size) + '%');
+            var chunk = file.slice(received, received + CHUNK_BYTES);
+            received = (await (await send('PUT', base + '?offset=' + received, chunk)).json()).received;
+        }
+        showProgress(file.size, file.size, 'Checking ' + file.name + '...');
+        var response = await send('POST', base + '/complete');
+        if (!response.ok) {
+            throw new Error('Upload failed (HTTP ' + response.status + ')');
+        }
+        var result = await response.json();
+        hideProgress('');
+        setProps('pending-upload', {data: {key: result.key, filename: file.name}});
+    }
+
+    document.addEventListener('click', function (event) {
+        if (!event.target.closest('#chunked-upload-button')) {
+            return;
+        }
+        var input = document.createElement('input');
+        input.type = 'file';
+        input.accept = '.csv';
+        input.addEventListener('change', function () {
+            if (input.files.length) {
+                upload(input.files[0]).catch(function (error) { hideProgress(error.message); });
+            }
+        });
+        input.click();
+    });
+})();
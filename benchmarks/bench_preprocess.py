@@ -0,0 +1,61 @@
+"""Compare upload parsing before and after the vectorized preprocess.
+
+Usage: python benchmarks/bench_preprocess.py [rows]
+"""
+import io
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingest import read_export  # noqa: E402
+from synthetic import make_export_csv  # noqa: E402
+
+
+def parse_agent_name(assignment):
+    if pd.isna(assignment):
+        return "Unassigned"
+    for part in str(assignment).split("||"):
+        if "Name:" in part:
+            return part.split("Name:")[1].strip()
+    return "Unassigned"
+
+
+def legacy_read_export(raw):
+    # The original row-wise pipeline, kept here as the baseline
+    df = pd.read_csv(io.BytesIO(raw))
+    df['created_at'] = pd.to_datetime(df['created_at'], format='%d-%m-%Y %H:%M', errors='coerce')
+    df['agent_name'] = df['last_agent_assignment'].apply(parse_agent_name)
+    df['age_hours'] = (pd.Timestamp.now() - df['created_at']).dt.total_seconds() / 3600
+    df['created_at'] = pd.to_datetime(df['created_at'], format='%d-%m-%Y %H:%M', errors='coerce')
+    return df
+
+
+def best_of(fn, raw, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = fn(raw)
+        timings.append(time.perf_counter() - start)
+    return min(timings), df
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    raw = make_export_csv(rows)
+    before, old = best_of(legacy_read_export, raw)
+    after, new = best_of(read_export, raw)
+    assert (old['agent_name'] == new['agent_name'].astype(object)).all()
+    assert old['created_at'].astype('datetime64[ns]').equals(new['created_at'].astype('datetime64[ns]'))
+    mb = 1024 * 1024
+    print(f"rows={rows} csv={len(raw) / mb:.1f}MB")
+    print(f"before: {before:.2f}s  {old.memory_usage(deep=True).sum() / mb:.0f}MB in memory")
+    print(f"after:  {after:.2f}s  {new.memory_usage(deep=True).sum() / mb:.0f}MB in memory")
+    print(f"speedup: {before / after:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Measure cold start: from launching the server to its first / response.
+
+Usage:
+    python benchmarks/cold_start.py [--repeat 5] [-- command ...]
+
+The command defaults to gunicorn with gunicorn.conf.py, run from the
+repository root. To time the container instead:
+
+    docker build -t tech-dashboard .
+    python benchmarks/cold_start.py -- docker run --rm -p 8050:8050 tech-dashboard
+"""
+import argparse
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_COMMAND = ['gunicorn', '-c', 'gunicorn.conf.py', 'dashboard:server']
+
+
+def time_to_first_response(command, url, timeout):
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=REPO_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"server exited with status {process.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except (urllib.error.URLError, ConnectionError, OSError):
+                time.sleep(0.05)
+        raise RuntimeError(f"no response from {url} within {timeout}s")
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:8050/')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('command', nargs='*', help='server command (after --)')
+    args = parser.parse_args()
+    command = args.command or DEFAULT_COMMAND
+
+    timings = []
+    for _ in range(args.repeat):
+        timings.append(time_to_first_response(command, args.url, args.timeout))
+        print(f"{timings[-1]:.2f}s")
+    print(f"{' '.join(command)}: median {statistics.median(timings):.2f}s, "
+          f"min {min(timings):.2f}s, max {max(timings):.2f}s over {len(timings)} starts")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
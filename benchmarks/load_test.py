@@ -0,0 +1,155 @@
+"""Measure dashboard callback latency as concurrency grows.
+
+Start the app first (e.g. gunicorn -c gunicorn.conf.py dashboard:server),
+then run:
+
+    python benchmarks/load_test.py --url http://localhost:8050 --levels 1,4,16
+
+The script uploads a synthetic export once (through the /upload route), then fires figure callbacks for
+random date ranges at each concurrency level and reports p50/p99 latency.
+"""
+import argparse
+import hashlib
+import json
+import random
+import statistics
+import sys
+import time
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from synthetic import make_export_csv
+
+
+GRAPH_IDS = [
+    'tickets-by-date-graph', 'status-pie-graph', 'top-categories-graph', 'top-subcategories-graph',
+    'agent-closed-graph', 'tech-issue-graph', 'knowledge-gap-graph', 'week-comparison-graph',
+    'last4-weeks-graph', 'jira-week-status-graph']
+
+
+def dependencies(url):
+    """Output key -> (inputs, state) of every callback of the app, as (id, property) pairs.
+
+    Read from the app's /_dash-dependencies, so payloads follow its callback
+    signatures as they change.
+    """
+    with urllib.request.urlopen(url.rstrip('/') + '/_dash-dependencies', timeout=600) as response:
+        callbacks = json.loads(response.read())
+    return {callback['output']: ([(dep['id'], dep['property']) for dep in callback['inputs']],
+                                 [(dep['id'], dep['property']) for dep in callback['state']])
+            for callback in callbacks}
+
+def callback_payload(callbacks, output, values, changed):
+    """Request body for the callback writing output ('id.property').
+
+    values maps (id, property) to the value sent; any other input or state of
+    the callback is sent as None, as for a component the page lacks. changed
+    is the (id, property) reported as having triggered the call.
+    """
+    output_key = next(key for key in callbacks if output in key.strip('.').split('...'))
+    inputs, state = callbacks[output_key]
+    return {
+        'output': output_key,
+        'outputs': [dict(zip(('id', 'property'), out.rsplit('.', 1))) for out in output_key.strip('.').split('...')],
+        'inputs': [{'id': i, 'property': p, 'value': values.get((i, p))} for i, p in inputs],
+        'state': [{'id': i, 'property': p, 'value': values.get((i, p))} for i, p in state],
+        'changedPropIds': ['.'.join(changed)],
+    }
+
+def post_callback(url, payload, query=''):
+    request = urllib.request.Request(
+        url.rstrip('/') + '/_dash-update-component' + query,
+        data=json.dumps(payload).encode('utf-8'),
+        headers={'Content-Type': 'application/json'})
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=600) as response:
+        body = response.read()
+    return time.perf_counter() - start, json.loads(body) if body else None
+
+def upload(url, raw, callbacks):
+    """Upload raw through the /upload route and wait until it is ingested."""
+    base = url.rstrip('/') + '/upload/load-test-' + hashlib.sha256(raw).hexdigest()[:16]
+    urllib.request.urlopen(urllib.request.Request(base + '?offset=0', data=raw, method='PUT')).read()
+    with urllib.request.urlopen(urllib.request.Request(base + '/complete', data=b'', method='POST')) as response:
+        key = json.loads(response.read())['key']
+    payload = callback_payload(
+        callbacks, 'dashboard-content.children',
+        {('pending-upload', 'data'): {'key': key, 'filename': 'load_test.csv'},
+         ('session-id', 'data'): uuid.uuid4().hex},
+        changed=('pending-upload', 'data'))
+    _, job = post_callback(url, payload)
+    if 'response' not in job:
+        # With background callbacks enabled the parse runs as a job; poll until it is done
+        query = f"?cacheKey={job['cacheKey']}&job={job['job']}"
+        while True:
+            time.sleep(0.5)
+            _, result = post_callback(url, payload, query=query)
+            if result and 'response' in result:
+                break
+    return key
+
+def random_range(rng, days=730, start='2023-01-01'):
+    first = rng.randrange(days)
+    last = rng.randrange(first, days)
+    base = time.mktime(time.strptime(start, '%Y-%m-%d'))
+    fmt = lambda d: time.strftime('%Y-%m-%d', time.localtime(base + d * 86400))
+    return fmt(first), fmt(last)
+
+def figure_payload(callbacks, key, graph_id, start_date=None, end_date=None):
+    return callback_payload(
+        callbacks, f'{graph_id}.figure',
+        {('dashboard-tabs', 'value'): 'dashboard', ('date-range', 'start_date'): start_date,
+         ('date-range', 'end_date'): end_date, ('cross-filter', 'data'): {}, ('dataset-key', 'data'): key},
+        changed=('dashboard-tabs', 'value'))
+
+def figure_request(url, callbacks, key, rng):
+    graph_id = rng.choice(GRAPH_IDS)
+    elapsed, _ = post_callback(url, figure_payload(callbacks, key, graph_id, *random_range(rng)))
+    return elapsed
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:8050')
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--levels', default='1,2,4,8,16')
+    parser.add_argument('--requests', type=int, default=100, help='requests per concurrency level')
+    parser.add_argument('--json', help='also write results to this file')
+    args = parser.parse_args()
+
+    raw = make_export_csv(args.rows)
+    callbacks = dependencies(args.url)
+    start = time.perf_counter()
+    key = upload(args.url, raw, callbacks)
+    print(f"uploaded {args.rows} rows in {time.perf_counter() - start:.2f}s")
+
+    results = []
+    for level in [int(level) for level in args.levels.split(',')]:
+        rngs = [random.Random(seed) for seed in range(args.requests)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=level) as pool:
+            latencies = list(pool.map(lambda rng: figure_request(args.url, callbacks, key, rng), rngs))
+        elapsed = time.perf_counter() - start
+        result = {
+            'concurrency': level,
+            'requests': len(latencies),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+            'mean_ms': round(statistics.mean(latencies) * 1000, 1),
+            'throughput_rps': round(len(latencies) / elapsed, 1),
+        }
+        results.append(result)
+        print(f"concurrency={level:<3} p50={result['p50_ms']:>8}ms  p99={result['p99_ms']:>8}ms  "
+              f"throughput={result['throughput_rps']}/s")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'url': args.url, 'rows': args.rows, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
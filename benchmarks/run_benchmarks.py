@@ -0,0 +1,283 @@
+"""Benchmark suite: parsing, chart aggregation, drill-downs and exports.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--sizes 10000,100000,1000000] [--output results.json]
+                                        [--baseline old.json] [--threshold 1.25]
+    python benchmarks/run_benchmarks.py --compare old.json new.json
+
+Each size runs in its own process on a synthetic export (see synthetic.py), so
+the reported peak RSS belongs to that size alone. Timings are the best of
+--repeat runs. With --baseline (or --compare) every timing that got slower
+than threshold x baseline (and by more than --min-delta seconds) is reported
+as a regression and the exit status is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from synthetic import make_export_csv  # noqa: E402
+
+
+# Chart (graph id) -> the aggregation behind it, as figures.py draws them
+CHART_AGGREGATES = {
+    'tickets-by-date-graph': 'tickets_by_date_status',
+    'status-pie-graph': 'status_counts',
+    'top-categories-graph': 'top_categories',
+    'top-subcategories-graph': 'top_subcategories',
+    'agent-closed-graph': 'agent_closed',
+    'tech-issue-graph': 'tech_issue_counts',
+    'knowledge-gap-graph': 'knowledge_gap_counts',
+    'week-comparison-graph': 'week_counts',
+    'last4-weeks-graph': 'last_4_weeks',
+    'jira-week-status-graph': 'jira_week_status',
+}
+
+
+def best_of(fn, repeat, setup=None):
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def drilldown_specs(df):
+    """One filter spec per handle_graph_click branch, on the most common values."""
+    from aggregates import WEEK_LABEL_FORMAT, week_start
+
+    def top(col):
+        return str(df[col].value_counts().index[0])
+
+    busiest = df['created_at'].dt.normalize().value_counts().index[0]
+    week = week_start(df['created_at'].dropna()).value_counts().index[0].strftime(WEEK_LABEL_FORMAT)
+    return {
+        'status-pie-graph': {'ticket_status': top('ticket_status')},
+        'top-categories-graph': {'cf_tech_issue_category': top('cf_tech_issue_category')},
+        'top-subcategories-graph': {'cf_cf_tech_issue_category_sub-category': top('cf_cf_tech_issue_category_sub-category')},
+        'agent-closed-graph': {'agent_name': top('agent_name')},
+        'tech-issue-graph': {'cf_is_tech_issue': top('cf_is_tech_issue')},
+        'knowledge-gap-graph': {'cf_knowledge_gap': top('cf_knowledge_gap')},
+        'tickets-by-date-graph': {'day': busiest.strftime('%Y-%m-%d'), 'ticket_status': top('ticket_status')},
+        'week-comparison-graph': {'week': week},
+        'jira-week-status-graph': {'week': week, 'jira': 1, 'status_group': 'open'},
+        'jira-week-status-graph-total': {'week': week, 'jira': 1},
+    }
+
+def run_size(rows, repeat):
+    """Time every stage on a synthetic export of rows rows; returns a result dict."""
+    import pandas as pd
+
+    import aggregates
+    import datastore
+    import downloads
+    import ingest
+    from figures import FIGURES
+    import indexes
+    from indexes import DatasetIndex, rows_for_filter
+
+    raw = make_export_csv(rows)
+    timings = {}
+
+    def forget_dataset():
+        datastore.store._entries.clear()
+        datastore.store._total_bytes = 0
+        shutil.rmtree(os.path.join(datastore.DATASET_DIR, datastore.content_key(raw)), ignore_errors=True)
+
+    timings['parse.load_upload'] = best_of(lambda: ingest.load_upload(raw), repeat, setup=forget_dataset)
+    timings['parse.read_export'] = best_of(lambda: ingest.read_export(raw), repeat)
+    rss_after_parse = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    key = datastore.content_key(raw)
+    timings['open.from_disk'] = best_of(lambda: ingest.get_dataset(key), repeat,
+                                        setup=lambda: datastore.store._entries.clear())
+    dataset = ingest.get_dataset(key)
+    df = dataset.df
+    cube = dataset.derived('cube', aggregates.build_cube)
+    index = dataset.derived('index', DatasetIndex)
+    timings['build.cube'] = best_of(lambda: aggregates.build_cube(df), repeat)
+    timings['build.index'] = best_of(lambda: DatasetIndex(df), repeat)
+
+    full_range = aggregates.slice_cube(cube, *aggregates.resolve_date_range(None, None, cube))
+    for graph_id, name in CHART_AGGREGATES.items():
+        aggregate = getattr(aggregates, name)
+        timings[f'aggregate.{graph_id}'] = best_of(lambda: aggregate(full_range), repeat)
+        timings[f'figure.{graph_id}'] = best_of(lambda: FIGURES[graph_id](full_range), repeat)
+
+    specs = drilldown_specs(df)
+    for branch, spec in specs.items():
+        timings[f'drilldown.{branch}'] = best_of(lambda: rows_for_filter(index, spec), repeat)
+
+    # Cross-filtering: stack up to four clicks and redraw every chart from the
+    # cube narrowed through its own indexes
+    cube_idx = indexes.cube_index(cube)
+    timings['build.cube_index'] = best_of(lambda: indexes.cube_index(cube), repeat)
+    stacked = {}
+    for depth, branch in enumerate(['status-pie-graph', 'top-categories-graph', 'agent-closed-graph',
+                                    'week-comparison-graph'], 1):
+        stacked.update(specs[branch])
+        def redraw(spec=dict(stacked)):
+            narrowed = cube.iloc[rows_for_filter(cube_idx, spec)]
+            for build_figure in FIGURES.values():
+                build_figure(narrowed)
+        timings[f'crossfilter.{depth}'] = best_of(redraw, repeat)
+
+    as_of = aggregates.resolve_as_of()
+    timings['table.high_age'] = best_of(lambda: aggregates.high_age_tickets(df, as_of), repeat)
+    timings['table.jira'] = best_of(lambda: aggregates.jira_tickets(df, as_of), repeat)
+
+    # Top customers over the whole range and its last 30 days: from the raw
+    # rows (what cross-filtered tables still do) and merged from the per-day
+    # summaries
+    summaries = {mode: ingest.customer_summary(dataset, mode) for mode in aggregates.TOP_N_MODES}
+    timings['build.customer_days'] = best_of(lambda: aggregates.build_daily_counts(df), repeat)
+    timings['build.customer_days_top'] = best_of(lambda: aggregates.daily_top(df), repeat)
+    start, end = aggregates.resolve_date_range(None, None, cube)
+    for span, first in [('all', start), ('30d', end - pd.Timedelta(days=29))]:
+        timings[f'table.top_customers.{span}.rows'] = best_of(
+            lambda: aggregates.top_customers(aggregates.rows_in_range(df, first, end)), repeat)
+        for mode, summary in summaries.items():
+            timings[f'table.top_customers.{span}.{mode}'] = best_of(
+                lambda: aggregates.merged_top_customers(summary, first, end), repeat)
+
+    def export(name, spec=None, gzip=False):
+        def run():
+            columns = downloads.EXPORT_COLUMNS.get(name)
+            chunks = downloads._csv_chunks(downloads.export_frame(dataset, name, spec, as_of),
+                                           lambda frame: dataset.with_columns(frame, columns))
+            for _ in (downloads._gzip_chunks(chunks) if gzip else chunks):
+                pass
+        return run
+
+    timings['export.filtered.csv'] = best_of(export('filtered', specs['status-pie-graph']), repeat)
+    timings['export.jira.csv'] = best_of(export('jira'), repeat)
+    timings['export.highage.csv'] = best_of(export('highage'), repeat)
+    timings['export.highage.csv.gz'] = best_of(export('highage', gzip=True), repeat)
+
+    return {
+        'rows': rows,
+        'csv_mb': round(len(raw) / 2 ** 20, 2),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'peak_rss_after_parse_mb': round(rss_after_parse / 1024, 1),
+        # Memory the opened dataset holds, by part (see Dataset.memory_usage)
+        'dataset_mb': {part: round(nbytes / 2 ** 20, 2) for part, nbytes in dataset.memory_usage().items()},
+        'timings': {name: round(seconds, 6) for name, seconds in timings.items()},
+    }
+
+def run_in_subprocess(rows, repeat):
+    # A fresh interpreter per size keeps peak RSS and caches per size
+    env = dict(os.environ, DATASET_DIR=tempfile.mkdtemp(prefix='bench-datasets-'),
+               METRICS_ENABLED='0', METRICS_LOG='0')
+    try:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--single', str(rows), '--repeat', str(repeat)],
+            env=env, check=True, stdout=subprocess.PIPE).stdout
+    finally:
+        shutil.rmtree(env['DATASET_DIR'], ignore_errors=True)
+    return json.loads(output)
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR, check=True,
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(baseline, current, threshold, min_delta):
+    """List of regressions of current against baseline."""
+    regressions = []
+    for size, result in current['results'].items():
+        old = baseline['results'].get(size)
+        if old is None:
+            continue
+        for name, seconds in result['timings'].items():
+            before = old['timings'].get(name)
+            if before and seconds > before * threshold and seconds - before > min_delta:
+                regressions.append((size, name, before, seconds))
+        before_rss, rss = old.get('peak_rss_mb'), result.get('peak_rss_mb')
+        if before_rss and rss > before_rss * threshold:
+            regressions.append((size, 'peak_rss_mb', before_rss, rss))
+    return regressions
+
+def report(regressions, threshold):
+    if not regressions:
+        print(f"No regressions (threshold {threshold}x).")
+        return 0
+    print(f"{len(regressions)} regression(s) over {threshold}x:")
+    for size, name, before, after in regressions:
+        print(f"  rows={size:<8} {name:<45} {before:>10.4f} -> {after:>10.4f}  ({after / before:.2f}x)")
+    return 1
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='results file (default: benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--baseline', help='earlier results file to check for regressions')
+    parser.add_argument('--threshold', type=float, default=1.25, help='slowdown ratio reported as a regression')
+    parser.add_argument('--min-delta', type=float, default=0.005, help='ignore slowdowns smaller than this (seconds)')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'), help='only compare two results files')
+    parser.add_argument('--single', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        json.dump(run_size(args.single, args.repeat), sys.stdout)
+        return 0
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        with open(args.compare[1]) as f:
+            current = json.load(f)
+        return report(compare(baseline, current, args.threshold, args.min_delta), args.threshold)
+
+    import numpy
+    import pandas
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'pandas': pandas.__version__,
+            'numpy': numpy.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'repeat': args.repeat,
+        },
+        'results': {},
+    }
+    for rows in [int(size) for size in args.sizes.split(',')]:
+        start = time.perf_counter()
+        result = results['results'][str(rows)] = run_in_subprocess(rows, args.repeat)
+        timings = result['timings']
+        print(f"rows={rows:<8} parse={timings['parse.load_upload']:.3f}s  "
+              f"charts={sum(v for k, v in timings.items() if k.startswith('figure.')):.3f}s  "
+              f"drilldowns={sum(v for k, v in timings.items() if k.startswith('drilldown.')):.4f}s  "
+              f"peak={result['peak_rss_mb']}MB  ({time.perf_counter() - start:.0f}s)")
+
+    output = args.output or os.path.join(
+        BENCH_DIR, 'results', f"bench-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            return report(compare(json.load(f), results, args.threshold, args.min_delta), args.threshold)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""Synthetic ticket exports shaped like the real helpdesk CSV."""
+import numpy as np
+import pandas as pd
+
+
+STATUSES = ['Open', 'Closed', 'Resolved', 'OnHold', 'Pending']
+STATUS_WEIGHTS = [0.2, 0.4, 0.25, 0.1, 0.05]
+
+
+def _zipf_choice(rng, values, n, a=1.6):
+    # Skewed pick so a few values dominate, like real categories and agents
+    idx = np.minimum(rng.zipf(a, n) - 1, len(values) - 1)
+    return np.asarray(values, dtype=object)[idx]
+
+
+def make_export(n_rows, seed=0, start='2023-01-01', days=730):
+    rng = np.random.default_rng(seed)
+    created = pd.Timestamp(start) + pd.to_timedelta(rng.integers(0, days * 24 * 60, n_rows), unit='min')
+    agents = [f'Agent {i}' for i in range(60)]
+    agent_idx = np.minimum(rng.zipf(1.6, n_rows) - 1, len(agents) - 1)
+    assignment = pd.Series('ID:' + pd.Series(agent_idx + 1000).astype(str)
+                           + '||Name:' + pd.Series(np.asarray(agents, dtype=object)[agent_idx])
+                           + '||Group:L' + pd.Series(rng.integers(1, 4, n_rows)).astype(str),
+                           dtype=object)
+    assignment[rng.random(n_rows) < 0.05] = np.nan
+    jira = pd.Series('https://jira.example.com/browse/TECH-' + pd.Series(rng.integers(1, 20000, n_rows)).astype(str), dtype=object)
+    jira[rng.random(n_rows) >= 0.15] = np.nan
+    n_customers = max(n_rows // 5, 10)
+    emails = 'user' + pd.Series(np.minimum(rng.zipf(1.3, n_rows), n_customers)).astype(str) + '@example.com'
+    return pd.DataFrame({
+        'ticket_id': np.arange(1, n_rows + 1),
+        'title': 'Cannot access feature ' + pd.Series(rng.integers(1, 500, n_rows)).astype(str),
+        'created_at': created.strftime('%d-%m-%Y %H:%M'),
+        'ticket_status': rng.choice(STATUSES, n_rows, p=STATUS_WEIGHTS),
+        'cf_tech_issue_category': _zipf_choice(rng, [f'Category {i}' for i in range(40)], n_rows),
+        'cf_cf_tech_issue_category_sub-category': _zipf_choice(rng, [f'Sub-category {i}' for i in range(150)], n_rows),
+        'last_agent_assignment': assignment,
+        'cf_is_tech_issue': np.where(rng.random(n_rows) < 0.6, 'Yes', 'No'),
+        'cf_knowledge_gap': np.where(rng.random(n_rows) < 0.3, 'Yes', 'No'),
+        'user_email': emails,
+        'cf_jira_link': jira,
+    })
+
+
+def make_export_csv(n_rows, seed=0, **kwargs):
+    return make_export(n_rows, seed=seed, **kwargs).to_csv(index=False).encode('utf-8')
@@ -0,0 +1,119 @@
+"""Measure bytes on the wire and estimated time-to-interactive on slow networks.
+
+Start the app first, once with COMPRESS_RESPONSES=1 to see the effect of
+compression (without it every encoding below transfers the same bytes), then run:
+
+    python benchmarks/transfer_size.py --url http://localhost:8050
+
+For each Accept-Encoding the script loads the page the way a browser does
+(HTML, then the scripts and stylesheets, then the layout and callback graph),
+uploads a synthetic export and requests every chart and a table page. It
+reports the transferred bytes per stage and a time-to-interactive estimate for
+each network profile: one round trip per stage plus the stage's bytes over the
+profile's bandwidth, plus the server time measured locally.
+"""
+import argparse
+import json
+import re
+import sys
+import time
+import urllib.request
+
+from load_test import GRAPH_IDS, callback_payload, dependencies, figure_payload, upload
+from synthetic import make_export_csv
+
+
+ENCODINGS = ['identity', 'gzip', 'br']
+
+# Browser devtools throttling presets: (round trip seconds, download bytes per second)
+NETWORK_PROFILES = {
+    'slow-3g': (2.0, 400_000 / 8),
+    'fast-3g': (0.5625, 1_440_000 / 8),
+}
+
+
+def fetch(url, encoding, payload=None):
+    """(raw bytes as transferred, seconds) for one GET, or POST when payload is given."""
+    headers = {'Accept-Encoding': encoding}
+    data = None
+    if payload is not None:
+        headers['Content-Type'] = 'application/json'
+        data = json.dumps(payload).encode('utf-8')
+    start = time.perf_counter()
+    with urllib.request.urlopen(urllib.request.Request(url, data=data, headers=headers), timeout=600) as response:
+        body = response.read()
+    return body, time.perf_counter() - start
+
+def stages(url, callbacks, key):
+    """Stage name -> list of (path, payload) requests the browser makes in parallel."""
+    html, _ = fetch(url + '/', 'identity')
+    page = html.decode('utf-8')
+    static = re.findall(r'<script src="([^"]+)"', page) + re.findall(r'<link rel="stylesheet" href="([^"]+)"', page)
+    charts = [('/_dash-update-component', figure_payload(callbacks, key, graph_id)) for graph_id in GRAPH_IDS]
+    table = [('/_dash-update-component', callback_payload(
+        callbacks, 'high-age-table.data',
+        {('dashboard-tabs', 'value'): 'insights', ('high-age-table', 'page_current'): 0,
+         ('high-age-table', 'page_size'): 10, ('high-age-table', 'sort_by'): [],
+         ('high-age-table', 'filter_query'): '', ('cross-filter', 'data'): {}, ('dataset-key', 'data'): key},
+        changed=('dashboard-tabs', 'value')))]
+    return {
+        'html': [('/', None)],
+        'bundles': [(path, None) for path in static],
+        'layout': [('/_dash-layout', None), ('/_dash-dependencies', None)],
+        'charts': charts,
+        'table': table,
+    }
+
+def measure(url, requests, encoding):
+    results = {}
+    for stage, stage_requests in requests.items():
+        sizes, seconds = [], []
+        for path, payload in stage_requests:
+            body, elapsed = fetch(url + path, encoding, payload)
+            sizes.append(len(body))
+            seconds.append(elapsed)
+        results[stage] = {'requests': len(sizes), 'bytes': sum(sizes), 'server_seconds': max(seconds)}
+    return results
+
+def time_to(results, stage_names, profile):
+    rtt, bandwidth = NETWORK_PROFILES[profile]
+    return sum(rtt + results[s]['bytes'] / bandwidth + results[s]['server_seconds'] for s in stage_names)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:8050')
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--json', help='also write results to this file')
+    args = parser.parse_args()
+    url = args.url.rstrip('/')
+
+    callbacks = dependencies(url)
+    key = upload(url, make_export_csv(args.rows), callbacks)
+    requests = stages(url, callbacks, key)
+    # Warm the server's caches so every encoding sees the same server time
+    measure(url, requests, 'identity')
+
+    report = {}
+    for encoding in ENCODINGS:
+        results = measure(url, requests, encoding)
+        report[encoding] = {
+            'stages': results,
+            'total_bytes': sum(stage['bytes'] for stage in results.values()),
+            'interactive_seconds': {p: round(time_to(results, ['html', 'bundles', 'layout'], p), 2)
+                                    for p in NETWORK_PROFILES},
+            'charts_seconds': {p: round(time_to(results, ['html', 'bundles', 'layout', 'charts'], p), 2)
+                               for p in NETWORK_PROFILES},
+        }
+        sizes = '  '.join(f"{stage}={result['bytes'] / 1024:.0f}KB" for stage, result in results.items())
+        print(f"{encoding:<9} {sizes}  total={report[encoding]['total_bytes'] / 1024:.0f}KB")
+        for profile in NETWORK_PROFILES:
+            print(f"{'':<9} {profile}: interactive {report[encoding]['interactive_seconds'][profile]}s, "
+                  f"charts drawn {report[encoding]['charts_seconds'][profile]}s")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'url': url, 'rows': args.rows, 'results': report}, f, indent=2)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,70 @@
+import json
+import os
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+
+from datastore import COLUMNAR_FORMAT_VERSION, DATASET_DIR, is_valid_key
+
+
+# Every dataset written to DATASET_DIR gets a small catalog.json next to its
+# columns (file name, size, date range, ...), so the dataset library can be
+# listed, and a dataset reopened, without loading any columns.
+CATALOG_FILE = 'catalog.json'
+
+
+def _catalog_path(key):
+    return os.path.join(DATASET_DIR, key, CATALOG_FILE)
+
+def _timestamp(value):
+    return value.isoformat() if isinstance(value, pd.Timestamp) and pd.notna(value) else None
+
+def dataset_info(key):
+    """The catalog entry of the dataset with content key, or None."""
+    if not is_valid_key(key):
+        return None
+    try:
+        with open(_catalog_path(key)) as f:
+            info = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return info if info.get('version') == COLUMNAR_FORMAT_VERSION else None
+
+def record_dataset(dataset, filename):
+    """Add dataset to the catalog (once; the first file name wins) and return its entry."""
+    info = dataset_info(dataset.key)
+    if info is not None:
+        return info
+    created = dataset.df['created_at']
+    info = {
+        'key': dataset.key,
+        'version': COLUMNAR_FORMAT_VERSION,
+        'filename': filename,
+        'rows': len(dataset.df),
+        'start': _timestamp(created.min()),
+        'end': _timestamp(created.max()),
+        'uploaded_at': datetime.now().isoformat(),
+    }
+    fd, tmp_path = tempfile.mkstemp(prefix='.catalog-', dir=os.path.dirname(_catalog_path(dataset.key)))
+    with os.fdopen(fd, 'w') as f:
+        json.dump(info, f)
+    os.replace(tmp_path, _catalog_path(dataset.key))
+    return info
+
+def list_datasets():
+    """Catalog entries of every dataset on disk, most recently uploaded first."""
+    try:
+        entries = [entry.name for entry in os.scandir(DATASET_DIR) if entry.is_dir()]
+    except OSError:
+        return []
+    infos = [info for info in map(dataset_info, entries) if info is not None]
+    return sorted(infos, key=lambda info: info['uploaded_at'], reverse=True)
+
+def dataset_label(info):
+    """One line describing a catalog entry, e.g. for a dropdown."""
+    span = ''
+    if info['start'] and info['end']:
+        span = ', {} to {}'.format(*(pd.Timestamp(info[k]).strftime('%d-%m-%Y') for k in ('start', 'end')))
+    uploaded = pd.Timestamp(info['uploaded_at']).strftime('%d-%m-%Y %H:%M')
+    return f"{info['filename']} ({info['rows']:,} tickets{span}; uploaded {uploaded})"
@@ -0,0 +1,74 @@
+import pandas as pd
+
+
+# Cross-filtering: a click on any chart adds a condition to one filter spec
+# (see indexes.FILTER_KEYS) that narrows every other chart and table. Each
+# chart ignores the keys its own clicks set, so it keeps showing the choices
+# next to the selected one instead of collapsing to it.
+FIGURE_FILTER_KEYS = {
+    'tickets-by-date-graph': ('day', 'week', 'month', 'ticket_status'),
+    'status-pie-graph': ('ticket_status',),
+    'top-categories-graph': ('cf_tech_issue_category',),
+    'top-subcategories-graph': ('cf_cf_tech_issue_category_sub-category',),
+    'agent-closed-graph': ('agent_name',),
+    'tech-issue-graph': ('cf_is_tech_issue',),
+    'knowledge-gap-graph': ('cf_knowledge_gap',),
+    'week-comparison-graph': ('week', 'month'),
+    'last4-weeks-graph': ('week',),
+    'jira-week-status-graph': ('week', 'jira', 'status_group'),
+}
+
+# A day, a week and a month are one time dimension: choosing one drops the others
+TIME_KEYS = ('day', 'week', 'month')
+
+FILTER_LABELS = {
+    'ticket_status': "status {}",
+    'cf_tech_issue_category': "category {}",
+    'cf_cf_tech_issue_category_sub-category': "subcategory {}",
+    'agent_name': "agent {}",
+    'cf_is_tech_issue': "tech issue {}",
+    'cf_knowledge_gap': "knowledge gap {}",
+    'day': "created on {}",
+    'week': "created in week starting {}",
+    'month': "created in month {}",
+    'jira': "with a Jira link",
+    'status_group': "Jira status {}",
+}
+
+
+def spec_key(spec):
+    """Hashable form of a filter spec, for memo keys."""
+    return tuple(sorted((spec or {}).items()))
+
+def without(spec, keys):
+    return {k: v for k, v in (spec or {}).items() if k not in keys}
+
+def figure_spec(spec, graph_id):
+    """The part of spec that narrows graph_id."""
+    return without(spec, FIGURE_FILTER_KEYS.get(graph_id, ()))
+
+def apply_click(spec, clicked, graph_id):
+    """spec with the conditions of a click on graph_id stacked on top.
+
+    The click replaces whatever graph_id selected before; clicking the
+    current selection again removes it.
+    """
+    spec = dict(spec or {})
+    owned = set(FIGURE_FILTER_KEYS.get(graph_id, ())) | set(clicked)
+    if owned & set(TIME_KEYS):
+        owned |= set(TIME_KEYS)
+    selected = {k: v for k, v in spec.items() if k in owned}
+    spec = without(spec, owned)
+    if selected != clicked:
+        spec.update(clicked)
+    return spec
+
+def describe(spec):
+    parts = []
+    for key, value in spec.items():
+        if key == 'day':
+            value = pd.Timestamp(value).strftime('%d-%m-%Y')
+        elif key == 'status_group':
+            value = value.capitalize()
+        parts.append(FILTER_LABELS.get(key, key + " {}").format(value))
+    return ", ".join(parts)
@@ -1,68 +1,340 @@
 import dash
-from dash import dcc, html, Input, Output, State, dash_table, callback_context
+from dash import dcc, html, Input, Output, State, dash_table, callback_context, no_update
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import io
-from datetime import datetime, timedelta
-import numpy as np
+from datetime import datetime
 import base64
-
+import os
+
+from aggregates import (
+    HIGH_AGE_COLUMNS, HIGH_AGE_HOURS, JIRA_OPEN_STATUSES, JIRA_TICKET_COLUMNS, OPEN_STATUSES, TOP_N_MODE, age_hours,
+    build_cube, high_age_tickets, jira_tickets, merged_top_customers, resolve_as_of, resolve_date_range,
+    rows_in_range, slice_cube, top_customers, total_jira_tickets)
+from catalog import dataset_info, dataset_label, list_datasets, record_dataset
+from crossfilter import apply_click, describe, figure_spec, spec_key
+from datastore import store
+from downloads import PARQUET_AVAILABLE, download_url, init_app as init_downloads
+from figures import FIGURES
+from indexes import DatasetIndex, cube_index, intersect, rows_for_filter
+from jobs import background_callback
+from metrics import init_app as init_metrics, instrumented, phase, record_rows, register_gauges
+from ingest import append_upload, customer_summary, get_dataset, load_file
+from serving import init_app as init_serving
+from sessions import HEARTBEAT_SECONDS, MAX_SESSIONS, active_sessions, admit, keep_alive, new_session_id
+from tables import filter_frame, page_of, query_columns, sort_frame, split_filter_part
+from uploads import discard_staged, init_app as init_uploads, stage_upload, staged_path
 
 app = dash.Dash(__name__)
 app.title = "Tech Support Dashboard"
+# WSGI entry point for gunicorn (see gunicorn.conf.py)
+server = app.server
+init_downloads(server)
+init_uploads(server)
+# Before init_metrics, so response sizes are recorded before compression
+init_serving(server)
+init_metrics(server)
+
+def dataset_gauges():
+    return [('dashboard_dataset_bytes', {'dataset': dataset.key[:12], 'part': part}, nbytes)
+            for dataset in store.datasets() for part, nbytes in dataset.memory_usage().items()]
+
+register_gauges(dataset_gauges)
+register_gauges(lambda: [('dashboard_sessions_active', {}, active_sessions())], per_process=False)
+
+DATASET_EXPIRED_MESSAGE = "This dataset is no longer cached on the server. Please upload the CSV again."
+SESSIONS_FULL_MESSAGE = (f"The dashboard is in use by {MAX_SESSIONS} sessions, its limit. "
+                         "Please try again in a few minutes.")
+
+def memory_summary(dataset):
+    # What the dataset costs this worker; free text is decoded from disk when shown
+    usage = dataset.memory_usage()
+    in_memory = usage['heap'] + usage['mapped'] + usage['derived']
+    return (f"{len(dataset.df):,} tickets, {in_memory / 2**20:.1f} MB in memory, "
+            f"{usage['disk'] / 2**20:.1f} MB of free text on disk")
+
+def download_links(text, link_id, color, key, export, spec=None, ageing=None):
+    # Files are streamed by the /download route; the page only carries URLs
+    links = [html.A(
+        text,
+        id=link_id,
+        href=download_url(key, export, spec, ageing=ageing),
+        target='_blank',
+        style={
+            'display': 'inline-block',
+            'margin': '10px',
+            'padding': '10px 20px',
+            'backgroundColor': color,
+            'color': 'white',
+            'textDecoration': 'none',
+            'borderRadius': '5px'
+        }
+    ), html.A("gzip", href=download_url(key, export, spec, fmt='csv.gz', ageing=ageing), target='_blank',
+              style={'margin': '0 5px'})]
+    if PARQUET_AVAILABLE:
+        links.append(html.A("parquet", href=download_url(key, export, spec, fmt='parquet', ageing=ageing),
+                            target='_blank', style={'margin': '0 5px'}))
+    return html.Div(links)
+
+def table_page(dataset, params, build, page_current, page_size, sort_by, filter_query, finish=None, columns=None):
+    """Tables page, sort and filter on the server; only the visible page is sent.
+
+    columns are those of the table: any still on disk (free text) are decoded
+    for the page's rows, or for every row when the table is sorted or
+    filtered on them.
+    """
+    def build_base():
+        with phase('aggregate'):
+            return build()
+
+    def build_view():
+        with phase('filter'):
+            frame = base
+            queried = [col for col in dict.fromkeys(query_columns(filter_query, sort_by))
+                       if col in dataset.text_columns and col not in frame]
+            if queried:
+                frame = dataset.with_columns(frame, list(frame.columns) + queried)
+            return sort_frame(filter_frame(frame, filter_query), sort_by)
+
+    def finish_page(page):
+        if finish is not None:
+            page = finish(page)
+        return page if columns is None else dataset.with_columns(page, columns)
+
+    base = dataset.memoized(params, build_base)
+    view = dataset.memoized(
+        (params, filter_query or '', tuple((c['column_id'], c['direction']) for c in sort_by or [])), build_view)
+    record_rows(len(view))
+    return page_of(view, page_current, page_size, finish_page)
+
+def filter_rows(dataset, spec):
+    """Row positions matching a cross-filter spec, cached per filter combination."""
+    def build():
+        with phase('filter'):
+            return rows_for_filter(dataset.derived('index', DatasetIndex), spec)
+    return dataset.memoized(('filter-rows', spec_key(spec)), build)
+
+def filter_cube(dataset, spec):
+    # The cube has every filtered dimension, so its own indexes narrow it
+    # without going back to the raw rows
+    def build():
+        with phase('filter'):
+            cube = dataset.derived('cube', build_cube)
+            index = dataset.derived('cube-index', lambda df: cube_index(cube))
+            return cube.iloc[rows_for_filter(index, spec)]
+    return dataset.memoized(('filter-cube', spec_key(spec)), build)
+
+def range_rows(dataset, start_date, end_date, spec=None):
+    def build():
+        with phase('filter'):
+            start_dt, end_dt = resolve_date_range(start_date, end_date, dataset.derived('cube', build_cube))
+            df = dataset.df.iloc[filter_rows(dataset, spec)] if spec else dataset.df
+            return rows_in_range(df, start_dt, end_dt)
+    return dataset.memoized(('rows', start_date, end_date, spec_key(spec)), build)
+
+def status_rows(dataset, statuses):
+    # Tickets whose lower-cased status is one of statuses, from the status index
+    index = dataset.derived('index', DatasetIndex)
+    def build(df):
+        return index.rows_where('ticket_status', lambda value: str(value).lower() in statuses)
+    return dataset.derived(('status-rows',) + tuple(statuses), build)
+
+def high_age_rows(dataset, as_of, threshold_hours):
+    # Open tickets created before the cutoff: exactly the high ageing tickets,
+    # found without computing a single age
+    cutoff = as_of - pd.Timedelta(hours=threshold_hours)
+    return intersect(status_rows(dataset, OPEN_STATUSES), dataset.derived('index', DatasetIndex).rows_before(cutoff))
+
+def open_jira_rows(dataset, as_of, threshold_hours):
+    return intersect(status_rows(dataset, JIRA_OPEN_STATUSES), dataset.derived('index', DatasetIndex).jira_rows)
+
+def candidate_rows(dataset, candidates, start_date, end_date, spec=None):
+    """The rows of candidates (positions) that are in the date range and match spec."""
+    with phase('filter'):
+        start_dt, end_dt = resolve_date_range(start_date, end_date, dataset.derived('cube', build_cube))
+        if pd.isna(start_dt) or pd.isna(end_dt):
+            return dataset.df.iloc[:0]
+        index = dataset.derived('index', DatasetIndex)
+        row_sets = [candidates, index.rows_between(start_dt, end_dt + pd.Timedelta(days=1))]
+        if spec:
+            row_sets.append(filter_rows(dataset, spec))
+        return dataset.df.iloc[intersect(*row_sets)]
+
+def ageing(as_of_date, as_of_time, threshold_hours):
+    """(as-of time, threshold, download parameters) from the ageing controls."""
+    if threshold_hours is None or threshold_hours < 0:
+        threshold_hours = HIGH_AGE_HOURS
+    params = {'as_of': as_of_date, 'as_of_time': as_of_time if as_of_date else None, 'hours': threshold_hours}
+    return resolve_as_of(as_of_date, as_of_time), float(threshold_hours), params
+
+def ageing_inputs():
+    return [Input('as-of-date', 'date'), Input('as-of-time', 'value'), Input('high-age-hours', 'value')]
+
+def range_cube(dataset, start_date, end_date, spec=None):
+    # Charts are answered from the daily aggregate cube, never the raw rows
+    def build():
+        with phase('filter'):
+            cube = dataset.derived('cube', build_cube)
+            date_range = resolve_date_range(start_date, end_date, cube)
+            return slice_cube(filter_cube(dataset, spec) if spec else cube, *date_range)
+    return dataset.memoized(('cube', start_date, end_date, spec_key(spec)), build)
+
+def date_bounds(df):
+    created_at_min = df['created_at'].min()
+    created_at_max = df['created_at'].max()
+    min_date_dt = created_at_min if isinstance(created_at_min, (pd.Timestamp, datetime)) else None
+    max_date_dt = created_at_max if isinstance(created_at_max, (pd.Timestamp, datetime)) else None
+    return min_date_dt, max_date_dt
+
+def library_options():
+    return [{'label': dataset_label(info), 'value': info['key']} for info in list_datasets()]
+
+def job_panel(name):
+    # Progress bar, status text and cancel button shown while a background job runs
+    return html.Div([
+        html.Progress(id=f'{name}-progress'),
+        html.Span(id=f'{name}-status', style={'margin': '0 10px'}),
+        html.Button('Cancel', id=f'{name}-cancel')
+    ], id=f'{name}-job', style={'display': 'none'})
+
+def job_dependencies(name, trigger):
+    """progress/running/cancel arguments for background_callback, for job_panel(name)."""
+    return dict(
+        progress=[Output(f'{name}-progress', 'value'), Output(f'{name}-progress', 'max'),
+                  Output(f'{name}-status', 'children')],
+        running=[(Output(f'{name}-job', 'style'), {'display': 'block', 'marginBottom': '10px'}, {'display': 'none'}),
+                 (Output(trigger, 'disabled'), True, False)],
+        cancel=[Input(f'{name}-cancel', 'n_clicks')],
+    )
+
+def server_side_table(table_id, columns, page_size=10, **kwargs):
+    return dash_table.DataTable(
+        id=table_id,
+        columns=columns,
+        data=[],
+        page_action='custom',
+        page_current=0,
+        page_size=page_size,
+        sort_action='custom',
+        sort_mode='multi',
+        sort_by=[],
+        filter_action='custom',
+        filter_query='',
+        **kwargs
+    )
+
+def serve_layout():
+    # A function, so every page load gets its own session id
+    return html.Div([
+        html.H2("Tech Support Dashboard"),
+        html.Div([
+            dcc.Upload(
+                id='upload-data',
+                children=html.Button('Upload CSV'),
+                multiple=False
+            ),
+            # Every dataset uploaded to this server, reopened without parsing
+            dcc.Dropdown(id='dataset-library', placeholder="Or open a previous upload...",
+                         style={'flex': '1', 'marginLeft': '10px'})
+        ], style={'display': 'flex', 'alignItems': 'center', 'marginBottom': '20px'}),
+        job_panel('upload'),
+        # Large exports go through the resumable upload in assets/chunked_upload.js
+        html.Div([
+            html.Button('Upload large CSV', id='chunked-upload-button'),
+            html.Progress(id='chunked-upload-progress', style={'display': 'none'}),
+            html.Span(id='chunked-upload-status', style={'marginLeft': '10px'}),
+            dcc.Store(id='pending-upload')
+        ], style={'marginBottom': '20px'}),
+        html.Div(id='file-info'),
+        html.Div(id='dashboard-content', children=html.Div("Please upload a CSV file.")),
+        dcc.Store(id='session-id', data=new_session_id()),
+        dcc.Interval(id='session-heartbeat', interval=HEARTBEAT_SECONDS * 1000)
+    ], style={'maxWidth': '1200px', 'margin': 'auto', 'padding': '20px'})
 
-def parse_agent_name(assignment):
-    if pd.isna(assignment):
-        return "Unassigned"
-    for part in str(assignment).split("||"):
-        if "Name:" in part:
-            return part.split("Name:")[1].strip()
-    return "Unassigned"
-
-def preprocess(df):
-    # Parse dates with dd-mm-yyyy format explicitly
-    df['created_at'] = pd.to_datetime(df['created_at'], format='%d-%m-%Y %H:%M', errors='coerce')
-    df['agent_name'] = df['last_agent_assignment'].apply(parse_agent_name)
-    df['age_hours'] = (pd.Timestamp.now() - df['created_at']).dt.total_seconds() / 3600
-    # Ensure columns are pandas Series for correct method access
-    for col in [
-        'created_at', 'ticket_status', 'cf_tech_issue_category', 'cf_cf_tech_issue_category_sub-category',
-        'agent_name', 'cf_is_tech_issue', 'cf_knowledge_gap', 'user_email', 'cf_jira_link', 'title', 'ticket_id', 'age_hours']:
-        if col in df and isinstance(df[col], np.ndarray):
-            df[col] = pd.Series(df[col])
-    return df
-
-app.layout = html.Div([
-    html.H2("Tech Support Dashboard"),
-    dcc.Upload(
-        id='upload-data',
-        children=html.Button('Upload CSV', style={'marginBottom': '20px'}),
-        multiple=False
-    ),
-    html.Div(id='file-info'),
-    html.Div(id='dashboard-content')
-], style={'maxWidth': '1200px', 'margin': 'auto', 'padding': '20px'})
+app.layout = serve_layout
 
 @app.callback(
+    Input('session-heartbeat', 'n_intervals'),
+    State('session-id', 'data'),
+    prevent_initial_call=True
+)
+@instrumented
+def session_heartbeat(n_intervals, session_id):
+    keep_alive(session_id)
+
+@app.callback(
+    Output('pending-upload', 'data'),
+    Input('upload-data', 'contents'),
+    State('upload-data', 'filename'),
+    prevent_initial_call=True
+)
+@instrumented
+def stage_uploaded_file(contents, filename):
+    # Park the file on disk so the (background) parse is not handed the whole
+    # base64 payload; the large-file upload stages its files the same way
+    content_type, content_string = contents.split(',')
+    return {'key': stage_upload(base64.b64decode(content_string)), 'filename': filename}
+
+@app.callback(
+    Output('pending-upload', 'data', allow_duplicate=True),
+    Input('dataset-library', 'value'),
+    prevent_initial_call=True
+)
+@instrumented
+def open_saved_dataset(key):
+    info = dataset_info(key)
+    if info is None:
+        return no_update
+    # Goes through the upload path, which finds the dataset on disk
+    return {'key': key, 'filename': info['filename']}
+
+@app.callback(
+    Output('dataset-library', 'options'),
+    Input('file-info', 'children')
+)
+@instrumented
+def list_saved_datasets(file_info):
+    return library_options()
+
+@background_callback(
+    app,
     Output('dashboard-content', 'children'),
     Output('file-info', 'children'),
-    Input('upload-data', 'contents'),
-    State('upload-data', 'filename')
+    Input('pending-upload', 'data'),
+    State('session-id', 'data'),
+    prevent_initial_call=True,
+    **job_dependencies('upload', 'upload-data')
 )
-def update_dashboard(contents, filename):
-    if contents is None:
+@instrumented
+def update_dashboard(set_progress, pending, session_id):
+    if not pending:
         return html.Div("Please upload a CSV file."), ""
-    content_type, content_string = contents.split(',')
-    decoded = io.BytesIO(base64.b64decode(content_string))
-    df = pd.read_csv(decoded)
-    df = preprocess(df)
-    # Ensure 'created_at' is datetime with dd-mm-yyyy format
-    df['created_at'] = pd.to_datetime(df['created_at'], format='%d-%m-%Y %H:%M', errors='coerce')
-    created_at_min = df['created_at'].min()
-    created_at_max = df['created_at'].max()
-    min_date_dt = created_at_min if isinstance(created_at_min, (pd.Timestamp, datetime)) else None
-    max_date_dt = created_at_max if isinstance(created_at_max, (pd.Timestamp, datetime)) else None
+    key, filename = pending['key'], pending['filename']
+    if not admit(session_id):
+        discard_staged(key)
+        return html.Div(SESSIONS_FULL_MESSAGE), ""
+    # The parsed frame stays on the server; the browser only keeps its key.
+    # Uploads are keyed by content, so a file uploaded before is not parsed again
+    dataset = get_dataset(key)
+    known = dataset_info(key) if dataset is not None else None
+    if dataset is None and os.path.exists(staged_path(key)):
+        try:
+            with phase('parse'):
+                dataset = load_file(
+                    staged_path(key),
+                    lambda done, total: set_progress((done, total, f"Parsing {filename}: {100 * done // total}%")))
+        except (KeyError, ValueError) as e:
+            discard_staged(key)
+            return html.Div(f"Could not read {filename}: {e}"), ""
+    discard_staged(key)
+    if dataset is None:
+        return html.Div(DATASET_EXPIRED_MESSAGE), ""
+    record_rows(len(dataset.df))
+    key = dataset.key
+    file_info = f"Loaded file: {filename} ({memory_summary(dataset)})"
+    if known is None:
+        record_dataset(dataset, filename)
+    elif known['filename'] != filename:
+        file_info += f" (same content as {known['filename']}, not parsed again)"
+    min_date_dt, max_date_dt = date_bounds(dataset.df)
 
     # Date range filter
     date_picker = dcc.DatePickerRange(
@@ -79,14 +351,91 @@ def update_dashboard(contents, filename):
             html.Label("Filter by Date Range:"),
             date_picker
         ], style={'marginBottom': '20px'}),
+        # Ticket ages are measured at this time (now, unless a date is picked)
+        html.Div([
+            html.Label("Ages as of:"),
+            dcc.DatePickerSingle(id='as-of-date', placeholder='Now', clearable=True, display_format='DD-MM-YYYY'),
+            dcc.Input(id='as-of-time', type='text', placeholder='HH:MM', debounce=True, size='6',
+                      style={'marginLeft': '5px'}),
+            html.Label("High ageing after (hours):", style={'marginLeft': '20px'}),
+            dcc.Input(id='high-age-hours', type='number', min=0, value=HIGH_AGE_HOURS, debounce=True,
+                      style={'width': '80px', 'marginLeft': '5px'})
+        ], style={'marginBottom': '20px'}),
+        html.Div([
+            dcc.Upload(
+                id='append-data',
+                children=html.Button('Append delta CSV'),
+                multiple=False
+            ),
+            dcc.Store(id='pending-append'),
+            job_panel('append'),
+            html.Div(id='append-info')
+        ], style={'marginBottom': '20px'}),
         html.Div(id='visualizations', children=[]),
-        dcc.Store(id='stored-data', data=df.to_json(date_format='iso', orient='split'))
-    ], html.Div(f"Loaded file: {filename}")
+        dcc.Store(id='dataset-key', data=key)
+    ], html.Div(file_info)
 
 @app.callback(
-    Output('download-info', 'children'),
-    Output('download-link', 'children'),
-    Output('filtered-table', 'children'),
+    Output('pending-append', 'data'),
+    Input('append-data', 'contents'),
+    State('append-data', 'filename'),
+    prevent_initial_call=True
+)
+@instrumented
+def stage_appended_file(contents, filename):
+    # Staged like uploads, so the append job is not handed the base64 payload
+    content_type, content_string = contents.split(',')
+    return {'key': stage_upload(base64.b64decode(content_string)), 'filename': filename}
+
+@background_callback(
+    app,
+    Output('dataset-key', 'data'),
+    Output('date-range', 'min_date_allowed'),
+    Output('date-range', 'max_date_allowed'),
+    Output('date-range', 'end_date'),
+    Output('append-info', 'children'),
+    Output('dataset-library', 'options', allow_duplicate=True),
+    Input('pending-append', 'data'),
+    State('dataset-key', 'data'),
+    State('date-range', 'max_date_allowed'),
+    State('date-range', 'end_date'),
+    prevent_initial_call=True,
+    **job_dependencies('append', 'append-data')
+)
+@instrumented
+def append_delta(set_progress, pending, key, max_date_allowed, end_date):
+    base = get_dataset(key)
+    if not pending or base is None:
+        if pending:
+            discard_staged(pending['key'])
+        return (no_update, no_update, no_update, no_update, DATASET_EXPIRED_MESSAGE if base is None else "",
+                no_update)
+    filename = pending['filename']
+    # Only the delta is parsed; tickets it repeats replace the existing rows
+    try:
+        with open(staged_path(pending['key']), 'rb') as f:
+            raw = f.read()
+        with phase('parse'):
+            dataset = append_upload(
+                base, raw, lambda done, total: set_progress((done, total, f"Appending {filename}...")))
+    except (OSError, KeyError, ValueError) as e:
+        return no_update, no_update, no_update, no_update, f"Could not append {filename}: {e}", no_update
+    finally:
+        discard_staged(pending['key'])
+    df = dataset.df
+    min_date, max_date = date_bounds(df)
+    # Keep an open-ended selection open-ended so the new days show up
+    if end_date and max_date_allowed and pd.Timestamp(end_date) >= pd.Timestamp(max_date_allowed):
+        end_date = max_date
+    added = len(df) - len(base.df)
+    base_info = dataset_info(base.key)
+    base_name = base_info['filename'] if base_info else "dataset"
+    record_dataset(dataset, f"{base_name} + {filename}")
+    return (dataset.key, min_date, max_date, end_date,
+            f"Appended {filename}: {added} new tickets; now {memory_summary(dataset)}", library_options())
+
+@app.callback(
+    Output('cross-filter', 'data'),
     Input('tickets-by-date-graph', 'clickData'),
     Input('status-pie-graph', 'clickData'),
     Input('top-categories-graph', 'clickData'),
@@ -97,31 +446,27 @@ def update_dashboard(contents, filename):
     Input('week-comparison-graph', 'clickData'),
     Input('last4-weeks-graph', 'clickData'),
     Input('jira-week-status-graph', 'clickData'),
-    Input('stored-data', 'data')
+    Input('cross-filter-clear', 'n_clicks'),
+    State('cross-filter', 'data'),
+    prevent_initial_call=True
 )
+@instrumented
 def handle_graph_click(tickets_click, status_click, categories_click, subcategories_click, 
                       agent_click, tech_click, knowledge_click, week_click, last4_click, 
-                      jira_click, data):
-    if data is None:
-        return "No data available", "", ""
-    
+                      jira_click, clear_clicks, current_spec):
     ctx = callback_context
     if not ctx.triggered:
-        return "Click on any graph element to view and download filtered data", "", ""
+        return no_update
     
     triggered_id = ctx.triggered[0]['prop_id'].split('.')[0]
     click_data = ctx.triggered[0]['value']
     
+    if triggered_id == 'cross-filter-clear':
+        return {}
     if not click_data:
-        return "Click on any graph element to view and download filtered data", "", ""
-    
-    df = pd.read_json(data, orient='split')
-    if not isinstance(df, pd.DataFrame):
-        df = pd.DataFrame(df)
-    df = pd.DataFrame(df.reset_index(drop=True))
+        return no_update
     
-    filtered_df = None
-    filter_description = ""
+    spec = None
     
     if triggered_id == 'status-pie-graph':
         # Extract status from the clicked pie slice
@@ -129,8 +474,7 @@ def handle_graph_click(tickets_click, status_click, categories_click, subcategor
         status_label = point['label']
         # Remove count from label (e.g., "Closed (150)" -> "Closed")
         status = status_label.split(' (')[0]
-        filtered_df = df[df['ticket_status'] == status]
-        filter_description = f"Tickets with status: {status}"
+        spec = {'ticket_status': status}
     
     elif triggered_id == 'top-categories-graph':
         # Extract category from the clicked bar
@@ -138,8 +482,7 @@ def handle_graph_click(tickets_click, status_click, categories_click, subcategor
         category_label = point['x']
         # Remove count from label
         category = category_label.split(' (')[0]
-        filtered_df = df[df['cf_tech_issue_category'] == category]
-        filter_description = f"Tickets with category: {category}"
+        spec = {'cf_tech_issue_category': category}
     
     elif triggered_id == 'top-subcategories-graph':
         # Extract subcategory from the clicked bar
@@ -147,15 +490,13 @@ def handle_graph_click(tickets_click, status_click, categories_click, subcategor
         subcategory_label = point['x']
         # Remove count from label
         subcategory = subcategory_label.split(' (')[0]
-        filtered_df = df[df['cf_cf_tech_issue_category_sub-category'] == subcategory]
-        filter_description = f"Tickets with subcategory: {subcategory}"
+        spec = {'cf_cf_tech_issue_category_sub-category': subcategory}
     
     elif triggered_id == 'agent-closed-graph':
         # Extract agent from the clicked bar
         point = click_data['points'][0]
         agent = point['x']
-        filtered_df = df[df['agent_name'] == agent]
-        filter_description = f"Tickets assigned to agent: {agent}"
+        spec = {'agent_name': agent}
     
     elif triggered_id == 'tech-issue-graph':
         # Extract tech issue value from the clicked pie slice
@@ -163,8 +504,7 @@ def handle_graph_click(tickets_click, status_click, categories_click, subcategor
         tech_label = point['label']
         # Remove count from label
         tech_value = tech_label.split(' (')[0]
-        filtered_df = df[df['cf_is_tech_issue'] == tech_value]
-        filter_description = f"Tickets with tech issue: {tech_value}"
+        spec = {'cf_is_tech_issue': tech_value}
     
     elif triggered_id == 'knowledge-gap-graph':
         # Extract knowledge gap value from the clicked pie slice
@@ -172,8 +512,7 @@ def handle_graph_click(tickets_click, status_click, categories_click, subcategor
         knowledge_label = point['label']
         # Remove count from label
         knowledge_value = knowledge_label.split(' (')[0]
-        filtered_df = df[df['cf_knowledge_gap'] == knowledge_value]
-        filter_description = f"Tickets with knowledge gap: {knowledge_value}"
+        spec = {'cf_knowledge_gap': knowledge_value}
     
     elif triggered_id == 'tickets-by-date-graph':
         # Extract date and status from the clicked line point
@@ -182,40 +521,29 @@ def handle_graph_click(tickets_click, status_click, categories_click, subcategor
         status_label = point['customdata'][0] if 'customdata' in point else point['legendgroup']
         # Remove count from status label
         status = status_label.split(' (')[0]
-        # Convert date string to datetime for filtering
-        date_dt = pd.to_datetime(date, format='%d-%m-%Y')
-        filtered_df = df[
-            (df['created_at'].dt.date == date_dt.date()) & 
-            (df['ticket_status'] == status)
-        ]
-        filter_description = f"Tickets created on {date} with status: {status}"
+        # Long ranges are drawn per week or month; the point says which
+        period = point['customdata'][1] if len(point.get('customdata') or []) > 1 else 'day'
+        if period == 'day':
+            # Convert date string to datetime for filtering
+            date_dt = pd.to_datetime(date, format='%d-%m-%Y')
+            spec = {'day': date_dt.strftime('%Y-%m-%d'), 'ticket_status': status}
+        else:
+            spec = {period: date, 'ticket_status': status}
     
     elif triggered_id == 'week-comparison-graph':
         # Extract week from the clicked line point
         point = click_data['points'][0]
         week_label = point['x']
-        year = point['customdata'][0] if 'customdata' in point else point['legendgroup']
-        # Convert week label to date range
-        week_start = pd.to_datetime(week_label, format='%d-%m-%Y')
-        week_end = week_start + timedelta(days=6)
-        filtered_df = df[
-            (df['created_at'] >= week_start) & 
-            (df['created_at'] <= week_end)
-        ]
-        filter_description = f"Tickets created in week starting {week_label}"
+        if len(point.get('customdata') or []) > 1 and point['customdata'][1] == 'month':
+            spec = {'month': week_label}
+        else:
+            spec = {'week': week_label}
     
     elif triggered_id == 'last4-weeks-graph':
         # Extract week from the clicked bar
         point = click_data['points'][0]
         week_label = point['x']
-        # Convert week label to date range
-        week_start = pd.to_datetime(week_label, format='%d-%m-%Y')
-        week_end = week_start + timedelta(days=6)
-        filtered_df = df[
-            (df['created_at'] >= week_start) & 
-            (df['created_at'] <= week_end)
-        ]
-        filter_description = f"Tickets created in week starting {week_label}"
+        spec = {'week': week_label}
     
     elif triggered_id == 'jira-week-status-graph':
         # Extract week and status from the clicked bar
@@ -224,318 +552,323 @@ def handle_graph_click(tickets_click, status_click, categories_click, subcategor
         status_label = point['customdata'][0] if 'customdata' in point else point['legendgroup']
         # Remove count from status label
         status = status_label.split(' (')[0]
-        # Convert week label to date range
-        week_start = pd.to_datetime(week_label, format='%d-%m-%Y')
-        week_end = week_start + timedelta(days=6)
-        filtered_df = df[
-            (df['created_at'] >= week_start) & 
-            (df['created_at'] <= week_end) &
-            (df['cf_jira_link'].notnull()) &
-            (df['cf_jira_link'].astype(str).str.strip() != '')
-        ]
+        spec = {'week': week_label, 'jira': 1}
         if status.lower() != 'total':
-            filtered_df = filtered_df[filtered_df['ticket_status'].str.lower() == status.lower()]
-        filter_description = f"Jira tickets in week starting {week_label} with status: {status}"
+            # Match every ticket_status the chart folded into this bar
+            spec['status_group'] = status.lower()
     
-    if filtered_df is not None and len(filtered_df) > 0:
-        filtered_df = pd.DataFrame(filtered_df.reset_index(drop=True))
-        csv_string = filtered_df.to_csv(index=False)
-        csv_bytes = csv_string.encode('utf-8')
-        csv_b64 = base64.b64encode(csv_bytes).decode()
-        download_link = html.A(
-            f"Download {len(filtered_df)} records as CSV",
-            id='download-csv',
-            href=f'data:text/csv;base64,{csv_b64}',
-            download=f'filtered_data_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv',
-            target='_blank',
-            style={
-                'display': 'inline-block',
-                'margin': '10px',
-                'padding': '10px 20px',
-                'backgroundColor': '#007bff',
-                'color': 'white',
-                'textDecoration': 'none',
-                'borderRadius': '5px'
-            }
-        )
-        # Show up to 100 rows in the table
-        table = dash_table.DataTable(
-            columns=[{"name": i, "id": i} for i in filtered_df.columns],
-            data=filtered_df.head(100).to_dict('records'),
-            style_table={"overflowX": "auto", "overflowY": "auto", "maxHeight": "600px"},
-            style_cell={"textAlign": "left", "maxWidth": 250, "whiteSpace": "normal"}
-        )
-        return f"Filter: {filter_description} - Found {len(filtered_df)} records", download_link, table
-    
-    return "No data found for the selected filter", "", ""
+    if spec is None:
+        return no_update
+    # Clicks stack: each one narrows the current selection of the other charts
+    return apply_click(current_spec, spec, triggered_id)
 
 @app.callback(
-    Output('visualizations', 'children'),
-    Input('date-range', 'start_date'),
-    Input('date-range', 'end_date'),
-    Input('stored-data', 'data')
+    Output('cross-filter-info', 'children'),
+    Output('download-info', 'children'),
+    Output('download-link', 'children'),
+    Input('cross-filter', 'data'),
+    *ageing_inputs(),
+    State('dataset-key', 'data')
 )
-def update_visuals(start_date, end_date, data):
-    if data is None:
-        return []
-    df = pd.read_json(data, orient='split')
-    # Ensure df is a DataFrame (not ndarray)
-    if not isinstance(df, pd.DataFrame):
-        df = pd.DataFrame(df)
-    # Handle date filtering with proper format conversion
-    if start_date:
-        start_dt = pd.to_datetime(start_date)
-    else:
-        start_dt = df['created_at'].min()
+@instrumented
+def show_cross_filter(spec, as_of_date, as_of_time, hours, key):
+    dataset = get_dataset(key)
+    if dataset is None:
+        return "", "No data available", ""
+    if not spec:
+        return "", "Click on any graph element to view and download filtered data", ""
     
-    if end_date:
-        end_dt = pd.to_datetime(end_date)
-    else:
-        end_dt = df['created_at'].max()
+    filter_description = describe(spec)
+    # Every combination resolves to row positions through the dataset's indexes
+    rows = filter_rows(dataset, spec)
+    record_rows(len(rows))
+    if len(rows) > 0:
+        # The file's ages are those of the table, at the as-of time
+        _, _, params = ageing(as_of_date, as_of_time, hours)
+        download_link = download_links(
+            f"Download {len(rows)} records as CSV", 'download-csv', '#007bff', key, 'filtered', spec,
+            ageing=params)
+        # The table below pages through every match on the server
+        return (f"Filtered by {filter_description} ({len(rows)} tickets)",
+                f"Filter: {filter_description} - Found {len(rows)} records", download_link)
     
-    mask = (df['created_at'] >= start_dt) & (df['created_at'] <= end_dt)
-    df = df[mask]
-    df = pd.DataFrame(df.reset_index(drop=True))
-
-    # 1. Total Created Tickets by Date
-    tickets_by_date_status = df.groupby([df['created_at'].dt.date, 'ticket_status']).size().reset_index(name='Tickets')
-    tickets_by_date_status = tickets_by_date_status.rename(columns={'created_at': 'date'})
-    # Format date as dd-mm-yyyy for display and sort in ascending order
-    tickets_by_date_status['date_formatted'] = pd.to_datetime(tickets_by_date_status['date']).dt.strftime('%d-%m-%Y')
-    tickets_by_date_status = tickets_by_date_status.sort_values('date')
-
-    # Calculate total count per status
-    status_counts = tickets_by_date_status.groupby('ticket_status')['Tickets'].sum().to_dict()
-
-    # Create a new column for legend labels with counts
-    tickets_by_date_status['status_label'] = tickets_by_date_status['ticket_status'].apply(
-        lambda s: f"{s} ({status_counts.get(s, 0)})"
-    )
+    return f"Filtered by {filter_description} (no tickets)", "No data found for the selected filter", ""
+
+# An age_hours comparison as one on created_at: older is created earlier
+AGE_BOUND_OPERATORS = {'gt': 'lt', 'ge': 'le', 'lt': 'gt', 'le': 'ge', 'eq': 'eq', 'ne': 'ne'}
+
+def age_filter_query(filter_query, as_of):
+    """filter_query with its age_hours clauses turned into created_at bounds at as_of."""
+    parts = []
+    for part in (filter_query or '').split(' && '):
+        column, operator, value = split_filter_part(part)
+        if column == 'age_hours' and operator in AGE_BOUND_OPERATORS and isinstance(value, float):
+            bound = as_of - pd.Timedelta(hours=value)
+            part = f'{{created_at}} {AGE_BOUND_OPERATORS[operator]} "{bound.isoformat()}"'
+            # Tickets created after as_of have no age to compare
+            parts.append(f'{{created_at}} le "{as_of.isoformat()}"')
+        parts.append(part)
+    return ' && '.join(parts)
+
+def query_changed(table_id):
+    # A new filter or sort order starts again from the first page
+    triggered = {trigger['prop_id'] for trigger in callback_context.triggered}
+    return bool(triggered & {f'{table_id}.filter_query', f'{table_id}.sort_by'})
 
-    fig_tickets_by_date = px.line(
-        tickets_by_date_status,
-        x='date_formatted',
-        y='Tickets',
-        color='status_label',
-        title='Total Created Tickets by Date (Status-wise, with Counts)'
+@app.callback(
+    Output('filtered-data-table', 'data'),
+    Output('filtered-data-table', 'columns'),
+    Output('filtered-data-table', 'page_count'),
+    Output('filtered-data-table', 'page_current'),
+    Input('cross-filter', 'data'),
+    Input('filtered-data-table', 'page_current'),
+    Input('filtered-data-table', 'page_size'),
+    Input('filtered-data-table', 'sort_by'),
+    Input('filtered-data-table', 'filter_query'),
+    *ageing_inputs(),
+    State('dataset-key', 'data')
+)
+@instrumented
+def page_filtered_table(spec, page_current, page_size, sort_by, filter_query, as_of_date, as_of_time, hours, key):
+    dataset = get_dataset(key)
+    if dataset is None or not spec:
+        return [], [], 0, 0
+    if callback_context.triggered_id == 'cross-filter' or query_changed('filtered-data-table'):
+        page_current = 0
+    as_of, _, _ = ageing(as_of_date, as_of_time, hours)
+    # Ages are only worked out for the rows on the page; ordering (and
+    # filtering) by age is by creation time, the other way round
+    sort_by = [{'column_id': 'created_at', 'direction': 'desc' if col['direction'] == 'asc' else 'asc'}
+               if col['column_id'] == 'age_hours' else col for col in sort_by or []]
+    filter_query = age_filter_query(filter_query, as_of)
+    data, page_count = table_page(
+        dataset, ('drilldown', spec_key(spec)),
+        lambda: dataset.df.iloc[filter_rows(dataset, spec)],
+        page_current, page_size, sort_by, filter_query,
+        finish=lambda page: page.assign(age_hours=age_hours(page['created_at'], as_of)),
+        columns=dataset.columns + ['age_hours'])
+    columns = [{"name": i, "id": i} for i in dataset.columns + ['age_hours']]
+    page_current = min(page_current or 0, page_count - 1)
+    return data, columns, page_count, page_current
+
+def register_insights_table(table_id, build, candidates=None, columns=None, summarized=None):
+    """Callback filling an Insights table with build(rows in the date range).
+
+    Ageing tables pass candidates(dataset, as_of, threshold_hours), the row
+    positions they can list, and get build(rows, as_of, threshold_hours).
+    Tables showing free text pass their columns (see table_page). Tables
+    that can be merged from per-day summaries pass summarized(dataset,
+    start_date, end_date, mode), used whenever no cross-filter is set; mode
+    is the 'top-n-mode' control.
+    """
+    modes = [Input('top-n-mode', 'value')] if summarized is not None else []
+
+    @app.callback(
+        Output(table_id, 'data'),
+        Output(table_id, 'page_count'),
+        Output(table_id, 'page_current'),
+        Input('dashboard-tabs', 'value'),
+        Input('date-range', 'start_date'),
+        Input('date-range', 'end_date'),
+        Input(table_id, 'page_current'),
+        Input(table_id, 'page_size'),
+        Input(table_id, 'sort_by'),
+        Input(table_id, 'filter_query'),
+        Input('cross-filter', 'data'),
+        *ageing_inputs(),
+        *modes,
+        State('dataset-key', 'data')
     )
-    fig_tickets_by_date.update_layout(clickmode='event+select')
-
-    # 2. Open vs Closed Status
-    # Calculate counts for each status
-    status_counts = df['ticket_status'].value_counts()
-    status_label_map = {status: f"{status} ({count})" for status, count in status_counts.items()}
-    df['ticket_status_label'] = df['ticket_status'].map(status_label_map)
-
-    fig_status = px.pie(df, names='ticket_status_label', title='Open vs Closed Status (with Counts)')
-    fig_status.update_layout(clickmode='event+select')
-
-    # 3. Top Categories
-    top_cats = df['cf_tech_issue_category'].value_counts().nlargest(10).reset_index()
-    top_cats.columns = ['Category', 'Count']
-    # Add count to category label for legend
-    top_cats['CategoryLabel'] = top_cats.apply(lambda row: f"{row['Category']} ({row['Count']})", axis=1)
-    fig_top_cats = px.bar(top_cats, x='CategoryLabel', y='Count', color='CategoryLabel', title='Top Tech Issue Categories (with Counts)')
-    fig_top_cats.update_layout(clickmode='event+select')
-
-    # Top Tech Sub-Categories
-    top_subcats = df['cf_cf_tech_issue_category_sub-category'].value_counts().nlargest(10).reset_index()
-    top_subcats.columns = ['Sub-Category', 'Count']
-    # Add count to sub-category label for legend
-    top_subcats['SubCategoryLabel'] = top_subcats.apply(lambda row: f"{row['Sub-Category']} ({row['Count']})", axis=1)
-    fig_top_subcats = px.bar(top_subcats, x='SubCategoryLabel', y='Count', color='SubCategoryLabel', title='Top Tech Sub-Categories (with Counts)')
-    fig_top_subcats.update_layout(clickmode='event+select')
-
-    # 4. Agent Closed Tickets
-    closed = df[df['ticket_status'].str.lower().str.contains('closed|resolved')]
-    agent_closed = closed['agent_name'].value_counts().nlargest(10).reset_index()
-    agent_closed.columns = ['Agent', 'Closed Tickets']
-    fig_agent_closed = px.bar(agent_closed, x='Agent', y='Closed Tickets', title='Agent Closed Tickets')
-    fig_agent_closed.update_layout(clickmode='event+select')
-
-    # 5. Tech Issue Count
-    # Calculate counts for each tech issue value
-    tech_issue_counts = df['cf_is_tech_issue'].value_counts()
-    tech_issue_label_map = {val: f"{val} ({count})" for val, count in tech_issue_counts.items()}
-    df['cf_is_tech_issue_label'] = df['cf_is_tech_issue'].map(tech_issue_label_map)
-
-    fig_tech_issue = px.pie(df, names='cf_is_tech_issue_label', title='Tech Issue (Yes/No) Count (with Counts)')
-    fig_tech_issue.update_layout(clickmode='event+select')
-
-    # 6. Knowledge Gap Count
-    # Calculate counts for each knowledge gap value
-    knowledge_gap_counts = df['cf_knowledge_gap'].value_counts()
-    knowledge_gap_label_map = {val: f"{val} ({count})" for val, count in knowledge_gap_counts.items()}
-    df['cf_knowledge_gap_label'] = df['cf_knowledge_gap'].map(knowledge_gap_label_map)
-
-    fig_knowledge_gap = px.pie(df, names='cf_knowledge_gap_label', title='Knowledge Gap (Yes/No) Count (with Counts)')
-    fig_knowledge_gap.update_layout(clickmode='event+select')
-
-    # 7. Week-over-Week Comparison
-    df['year'] = df['created_at'].dt.isocalendar().year
-    df['week'] = df['created_at'].dt.isocalendar().week
-    week_counts = df.groupby(['year', 'week']).size().reset_index(name='Tickets')
-    # Create proper week labels with start date in dd-mm-yyyy format
-    week_counts['week_start_date'] = pd.to_datetime(
-        week_counts['year'].astype(str) + '-W' + week_counts['week'].astype(str).str.zfill(2) + '-1', 
-        format='%Y-W%W-%w'
+    @instrumented(name=f'update_table:{table_id}')
+    def update_table(tab, start_date, end_date, page_current, page_size, sort_by, filter_query, spec,
+                     as_of_date, as_of_time, hours, *args):
+        *mode, key = args
+        # Insights tables are only computed while their tab is open
+        if tab != 'insights':
+            return no_update, no_update, no_update
+        dataset = get_dataset(key)
+        if dataset is None:
+            return [], 0, 0
+        resets = ['date-range', 'cross-filter']
+        if summarized is not None and not spec:
+            # The summaries only know days, so cross-filters read the rows
+            resets.append('top-n-mode')
+            params = (table_id, start_date, end_date, mode[0])
+            def build_table():
+                return summarized(dataset, start_date, end_date, mode[0])
+        elif candidates is None:
+            params = (table_id, start_date, end_date, spec_key(spec))
+            def build_table():
+                return build(range_rows(dataset, start_date, end_date, spec))
+        else:
+            resets += ['as-of-date', 'as-of-time', 'high-age-hours']
+            as_of, threshold_hours, _ = ageing(as_of_date, as_of_time, hours)
+            params = (table_id, start_date, end_date, spec_key(spec), as_of, threshold_hours)
+            def build_table():
+                rows = candidate_rows(
+                    dataset, candidates(dataset, as_of, threshold_hours), start_date, end_date, spec)
+                return build(rows, as_of, threshold_hours)
+        if callback_context.triggered_id in resets or query_changed(table_id):
+            page_current = 0
+        data, page_count = table_page(
+            dataset, params, build_table, page_current, page_size, sort_by, filter_query, columns=columns)
+        page_current = min(page_current or 0, page_count - 1)
+        return data, page_count, page_current
+    return update_table
+
+def summary_top_customers(dataset, start_date, end_date, mode):
+    with phase('aggregate'):
+        date_range = resolve_date_range(start_date, end_date, dataset.derived('cube', build_cube))
+        return merged_top_customers(customer_summary(dataset, mode), *date_range)
+
+register_insights_table('high-age-table', high_age_tickets, candidates=high_age_rows, columns=HIGH_AGE_COLUMNS)
+register_insights_table('top-customers-table', top_customers, summarized=summary_top_customers)
+register_insights_table('jira-table', lambda df, as_of, threshold_hours: jira_tickets(df, as_of),
+                        candidates=open_jira_rows, columns=JIRA_TICKET_COLUMNS)
+
+def register_figure(graph_id, build_figure):
+    @app.callback(
+        Output(graph_id, 'figure'),
+        Output(f'{graph_id}-rendered', 'data'),
+        Input('dashboard-tabs', 'value'),
+        Input('date-range', 'start_date'),
+        Input('date-range', 'end_date'),
+        Input('cross-filter', 'data'),
+        State('dataset-key', 'data'),
+        State(f'{graph_id}-rendered', 'data')
     )
-    week_counts['week_label'] = week_counts['week_start_date'].dt.strftime('%d-%m-%Y')
-    week_counts = week_counts.sort_values('week_start_date')
-    fig_week = px.line(week_counts, x='week_label', y='Tickets', color='year', title='Week-over-Week Ticket Creation')
-    fig_week.update_layout(clickmode='event+select')
+    @instrumented(name=f'update_figure:{graph_id}')
+    def update_figure(tab, start_date, end_date, cross_filter, key, rendered):
+        # Figures are only drawn while the Dashboard tab is open, and skipped
+        # when they already show this dataset, date range and filter (a
+        # chart is not narrowed by its own selection)
+        spec = figure_spec(cross_filter, graph_id)
+        signature = [key, start_date, end_date, spec]
+        if tab != 'dashboard' or rendered == signature:
+            return no_update, no_update
+        dataset = get_dataset(key)
+        if dataset is None:
+            return no_update, no_update
+        def build():
+            cube = range_cube(dataset, start_date, end_date, spec)
+            record_rows(len(cube))
+            with phase('figure'):
+                return build_figure(cube)
+        figure = dataset.memoized(('figure', graph_id, start_date, end_date, spec_key(spec)), build)
+        return figure, signature
+    return update_figure
+
+for graph_id, build_figure in FIGURES.items():
+    register_figure(graph_id, build_figure)
 
-    # 7b. Last 4 Weeks Comparison
-    last_4_weeks = week_counts.sort_values('week_start_date', ascending=False).head(4).sort_values('week_start_date')
-    last_4_weeks['label'] = last_4_weeks['week_label']
-    fig_last4 = px.bar(last_4_weeks, x='label', y='Tickets', title='Ticket Counts: Last 4 Weeks')
-    fig_last4.update_layout(clickmode='event+select')
+@app.callback(
+    Output('jira-total', 'children'),
+    Input('date-range', 'start_date'),
+    Input('date-range', 'end_date'),
+    Input('cross-filter', 'data'),
+    State('dataset-key', 'data')
+)
+@instrumented
+def update_jira_total(start_date, end_date, cross_filter, key):
+    dataset = get_dataset(key)
+    if dataset is None:
+        return ""
+    # Counts what the Jira chart below it shows
+    cube = range_cube(dataset, start_date, end_date, figure_spec(cross_filter, 'jira-week-status-graph'))
+    with phase('aggregate'):
+        total = total_jira_tickets(cube)
+    return f"Total Jira Tickets: {total}"
+
+@app.callback(
+    Output('visualizations', 'children'),
+    Input('dataset-key', 'data')
+)
+@instrumented
+def update_visuals(key):
+    # Lays out the tabs once per dataset; every figure and table fills itself
+    # in through its own callback
+    dataset = get_dataset(key)
+    if dataset is None:
+        return html.Div(DATASET_EXPIRED_MESSAGE) if key else []
+
+    graphs = []
+    for graph_id in FIGURES:
+        if graph_id == 'jira-week-status-graph':
+            graphs.append(html.H4(id='jira-total'))
+        graphs.append(html.Div([
+            dcc.Graph(id=graph_id),
+            dcc.Store(id=f'{graph_id}-rendered')
+        ]))
 
     # 8. High Ageing Tickets
-    high_age = df[(df['ticket_status'].str.lower() == 'open') & (df['age_hours'] > 72)]
-    high_age = high_age.sort_values('age_hours', ascending=False)
-    high_age_table = dash_table.DataTable(
+    high_age_table = server_side_table(
+        'high-age-table',
         columns=[
             {'name': 'ticket_id', 'id': 'ticket_id'},
             {'name': 'title', 'id': 'title'},
             {'name': 'agent_name', 'id': 'agent_name'},
-            {'name': 'age_hours', 'id': 'age_hours'}
+            {'name': 'age_hours', 'id': 'age_hours', 'type': 'numeric'}
         ],
-        data=high_age[['ticket_id', 'title', 'agent_name', 'age_hours']].to_dict('records'),
         style_table={'overflowX': 'auto'},
-        style_cell={'textAlign': 'left'},
-        page_size=10
+        style_cell={'textAlign': 'left'}
     )
 
     # 9. Top Customers by Ticket Count (by email)
-    top_customers = df['user_email'].value_counts().nlargest(10).reset_index()
-    top_customers.columns = ['Email', 'Ticket Count']
-    top_customers_table = dash_table.DataTable(
-        columns=[{'name': i, 'id': i} for i in top_customers.columns],
-        data=top_customers.to_dict('records'),
+    top_customers_table = server_side_table(
+        'top-customers-table',
+        columns=[{'name': 'Email', 'id': 'Email'}, {'name': 'Ticket Count', 'id': 'Ticket Count', 'type': 'numeric'}],
         style_table={'overflowX': 'auto'},
-        style_cell={'textAlign': 'left'},
-        page_size=10
+        style_cell={'textAlign': 'left'}
     )
 
     # 10. Tickets with Jira Link and status open/onhold
-    jira_tickets = df[
-        df['cf_jira_link'].notnull() &
-        (df['cf_jira_link'].astype(str).str.strip() != '') &
-        (df['ticket_status'].str.lower().isin(['open', 'onhold']))
-    ].copy()
-    jira_tickets['age_days'] = (jira_tickets['age_hours'] // 24).astype(int)
-    jira_tickets = jira_tickets.sort_values('age_days', ascending=False)
-    jira_table = dash_table.DataTable(
+    jira_table = server_side_table(
+        'jira-table',
         columns=[
             {'name': 'ticket_id', 'id': 'ticket_id'},
             {'name': 'ticket_status', 'id': 'ticket_status'},
             {'name': 'cf_jira_link', 'id': 'cf_jira_link'},
             {'name': 'agent_name', 'id': 'agent_name'},
-            {'name': 'age_days', 'id': 'age_days'}
+            {'name': 'age_days', 'id': 'age_days', 'type': 'numeric'}
         ],
-        data=jira_tickets[['ticket_id', 'ticket_status', 'cf_jira_link', 'agent_name', 'age_days']].to_dict('records'),
         style_table={'overflowX': 'auto'},
-        style_cell={'textAlign': 'left'},
-        page_size=10
+        style_cell={'textAlign': 'left'}
     )
 
-    # Jira tickets with week-wise status breakdown (open, onhold, closed)
-    jira_status = df[
-        df['cf_jira_link'].notnull() & (df['cf_jira_link'].astype(str).str.strip() != '')
-    ].copy()
-    jira_status['status_group'] = jira_status['ticket_status'].str.lower().replace({
-        'on hold': 'onhold', 'onhold': 'onhold', 'open': 'open', 'closed': 'closed', 'resolved': 'closed'
-    })
-    jira_status = jira_status[jira_status['status_group'].isin(['open', 'onhold', 'closed'])]
-    # Group by week for Jira tickets with proper date formatting
-    jira_status['year'] = jira_status['created_at'].dt.isocalendar().year
-    jira_status['week'] = jira_status['created_at'].dt.isocalendar().week
-    jira_status['week_start_date'] = jira_status.apply(
-        lambda row: pd.to_datetime(f"{row['year']}-W{row['week']:02d}-1", format='%Y-W%W-%w'), axis=1
-    )
-    jira_status['week_label'] = jira_status['week_start_date'].dt.strftime('%d-%m-%Y')
-
-    # Group by week and status
-    jira_week_status = jira_status.groupby(['week_label', 'status_group']).size().reset_index(name='Count')
-
-    # Calculate total Jira tickets per week
-    jira_week_total = jira_status.groupby('week_label').size().reset_index(name='Count')
-    jira_week_total['status_group'] = 'total'
-
-    # Combine for plotting and sort by date
-    jira_week_status = pd.concat([jira_week_status, jira_week_total], ignore_index=True)
-    # Sort by week_label to maintain chronological order
-    jira_week_status = jira_week_status.sort_values('week_label')
-
-    # Calculate total count per status_group
-    jira_status_group_counts = jira_week_status.groupby('status_group')['Count'].sum().to_dict()
-
-    # Add count to legend labels
-    jira_week_status['status_label'] = jira_week_status['status_group'].apply(
-        lambda s: f"{s.capitalize()} ({jira_status_group_counts.get(s, 0)})"
-    )
-
-    total_jira_count = len(jira_status)
-
-    fig_jira_week_status = px.bar(
-        jira_week_status,
-        x='week_label',
-        y='Count',
-        color='status_label',
-        barmode='group',
-        title='Jira Tickets by Status (Week-wise, including Total)'
-    )
-    fig_jira_week_status.update_layout(clickmode='event+select')
-
     return [
-        dcc.Tabs([
-            dcc.Tab(label='Dashboard', children=[
-                html.Div([
-                    dcc.Graph(id='tickets-by-date-graph', figure=fig_tickets_by_date)
-                ]),
-                html.Div([
-                    dcc.Graph(id='status-pie-graph', figure=fig_status)
-                ]),
-                html.Div([
-                    dcc.Graph(id='top-categories-graph', figure=fig_top_cats)
-                ]),
-                html.Div([
-                    dcc.Graph(id='top-subcategories-graph', figure=fig_top_subcats)
-                ]),
-                html.Div([
-                    dcc.Graph(id='agent-closed-graph', figure=fig_agent_closed)
-                ]),
-                html.Div([
-                    dcc.Graph(id='tech-issue-graph', figure=fig_tech_issue)
-                ]),
-                html.Div([
-                    dcc.Graph(id='knowledge-gap-graph', figure=fig_knowledge_gap)
-                ]),
-                html.Div([
-                    dcc.Graph(id='week-comparison-graph', figure=fig_week)
-                ]),
-                html.Div([
-                    dcc.Graph(id='last4-weeks-graph', figure=fig_last4)
-                ]),
-                html.H4(f"Total Jira Tickets: {total_jira_count}"),
-                html.Div([
-                    dcc.Graph(id='jira-week-status-graph', figure=fig_jira_week_status)
-                ])
-            ]),
-            dcc.Tab(label='Download Filtered Data', children=[
+        # Clicks on the charts stack into one filter for every chart and table
+        html.Div([
+            html.Span(id='cross-filter-info', style={'marginRight': '10px'}),
+            html.Button('Clear filters', id='cross-filter-clear'),
+            dcc.Store(id='cross-filter', data={})
+        ], style={'marginBottom': '10px'}),
+        dcc.Tabs(id='dashboard-tabs', value='dashboard', children=[
+            dcc.Tab(label='Dashboard', value='dashboard', children=graphs),
+            dcc.Tab(label='Download Filtered Data', value='download', children=[
                 html.Div(id='download-section', children=[
-                    html.H4("Click on any graph element above to view and download filtered data"),
+                    html.H4("Click on graph elements on the Dashboard tab to view and download filtered data"),
                     html.Div(id='download-info'),
                     html.Div(id='download-link'),
-                    html.Div(id='filtered-table')
+                    html.Div(id='filtered-table', children=[
+                        server_side_table(
+                            'filtered-data-table',
+                            columns=[],
+                            page_size=50,
+                            style_table={"overflowX": "auto", "overflowY": "auto", "maxHeight": "600px"},
+                            style_cell={"textAlign": "left", "maxWidth": 250, "whiteSpace": "normal"}
+                        )
+                    ])
                 ])
             ]),
-            dcc.Tab(label='Insights', children=[
-                html.H4("High Ageing Tickets (Open > 72 hours)"),
+            dcc.Tab(label='Insights', value='insights', children=[
+                html.H4(f"High Ageing Tickets (Open > {HIGH_AGE_HOURS:g} hours)", id='high-age-title'),
                 html.Div(id='highage-download-link'),
                 high_age_table,
                 html.H4("Top Customers by Ticket Count (Email ID)"),
+                # Approximate counts come from each day's largest only (see aggregates.daily_top)
+                dcc.RadioItems(id='top-n-mode', value=TOP_N_MODE, inline=True,
+                               options=[{'label': 'Exact', 'value': 'exact'},
+                                        {'label': 'Approximate (faster)', 'value': 'approximate'}]),
                 top_customers_table,
                 html.H4("Tickets with Jira Link"),
                 html.Div(id='jira-download-link'),
@@ -547,81 +880,55 @@ def update_visuals(start_date, end_date, data):
 # Callback to provide download link for Jira tickets
 @app.callback(
     Output('jira-download-link', 'children'),
-    Input('stored-data', 'data')
+    Input('dashboard-tabs', 'value'),
+    *ageing_inputs(),
+    State('dataset-key', 'data')
 )
-def download_jira_link(data):
-    if data is None:
+@instrumented
+def download_jira_link(tab, as_of_date, as_of_time, hours, key):
+    if tab != 'insights':
+        return no_update
+    dataset = get_dataset(key)
+    if dataset is None:
         return ""
-    df = pd.read_json(data, orient='split')
-    if not isinstance(df, pd.DataFrame):
-        df = pd.DataFrame(df)
+    as_of, threshold_hours, params = ageing(as_of_date, as_of_time, hours)
     # Filter for Jira tickets as in the table
-    jira_tickets = df[
-        df['cf_jira_link'].notnull() &
-        (df['cf_jira_link'].astype(str).str.strip() != '') &
-        (df['ticket_status'].str.lower().isin(['open', 'onhold']))
-    ].copy()
-    jira_tickets['age_days'] = (jira_tickets['age_hours'] // 24).astype(int)
-    jira_tickets = jira_tickets.sort_values('age_days', ascending=False)
-    if len(jira_tickets) == 0:
+    with phase('aggregate'):
+        count = dataset.memoized(('jira-count', as_of), lambda: len(jira_tickets(
+            dataset.df.iloc[open_jira_rows(dataset, as_of, threshold_hours)], as_of)))
+    record_rows(count)
+    if count == 0:
         return "No Jira tickets to download."
-    csv_string = jira_tickets[['ticket_id', 'ticket_status', 'cf_jira_link', 'agent_name', 'age_days']].to_csv(index=False)
-    csv_bytes = csv_string.encode('utf-8')
-    csv_b64 = base64.b64encode(csv_bytes).decode()
-    download_link = html.A(
-        f"Download Jira Tickets as CSV ({len(jira_tickets)} records)",
-        id='download-jira-csv',
-        href=f'data:text/csv;base64,{csv_b64}',
-        download=f'jira_tickets_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv',
-        target='_blank',
-        style={
-            'display': 'inline-block',
-            'margin': '10px',
-            'padding': '10px 20px',
-            'backgroundColor': '#28a745',
-            'color': 'white',
-            'textDecoration': 'none',
-            'borderRadius': '5px'
-        }
-    )
-    return download_link
+    return download_links(
+        f"Download Jira Tickets as CSV ({count} records)", 'download-jira-csv', '#28a745', key, 'jira',
+        ageing=params)
 
 # Callback to provide download link for High Ageing Tickets
 @app.callback(
     Output('highage-download-link', 'children'),
-    Input('stored-data', 'data')
+    Output('high-age-title', 'children'),
+    Input('dashboard-tabs', 'value'),
+    *ageing_inputs(),
+    State('dataset-key', 'data')
 )
-def download_highage_link(data):
-    if data is None:
-        return ""
-    df = pd.read_json(data, orient='split')
-    if not isinstance(df, pd.DataFrame):
-        df = pd.DataFrame(df)
-    # Filter for high ageing tickets as in the table
-    high_age = df[(df['ticket_status'].str.lower() == 'open') & (df['age_hours'] > 72)].copy()
-    high_age = high_age.sort_values('age_hours', ascending=False)
-    if len(high_age) == 0:
-        return "No high ageing tickets to download."
-    csv_string = high_age[['ticket_id', 'title', 'agent_name', 'age_hours']].to_csv(index=False)
-    csv_bytes = csv_string.encode('utf-8')
-    csv_b64 = base64.b64encode(csv_bytes).decode()
-    download_link = html.A(
-        f"Download High Ageing Tickets as CSV ({len(high_age)} records)",
-        id='download-highage-csv',
-        href=f'data:text/csv;base64,{csv_b64}',
-        download=f'high_age_tickets_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv',
-        target='_blank',
-        style={
-            'display': 'inline-block',
-            'margin': '10px',
-            'padding': '10px 20px',
-            'backgroundColor': '#dc3545',
-            'color': 'white',
-            'textDecoration': 'none',
-            'borderRadius': '5px'
-        }
-    )
-    return download_link
+@instrumented
+def download_highage_link(tab, as_of_date, as_of_time, hours, key):
+    if tab != 'insights':
+        return no_update, no_update
+    as_of, threshold_hours, params = ageing(as_of_date, as_of_time, hours)
+    title = f"High Ageing Tickets (Open > {threshold_hours:g} hours"
+    title += f" on {as_of:%d-%m-%Y %H:%M})" if as_of_date else ")"
+    dataset = get_dataset(key)
+    if dataset is None:
+        return "", title
+    # The index lookups behind the table give the count without computing ages
+    count = len(high_age_rows(dataset, as_of, threshold_hours))
+    record_rows(count)
+    if count == 0:
+        return "No high ageing tickets to download.", title
+    return download_links(
+        f"Download High Ageing Tickets as CSV ({count} records)", 'download-highage-csv', '#dc3545', key, 'highage',
+        ageing=params), title
 
 #if __name__ == '__main__':
 #    app.run(debug=True)
@@ -0,0 +1,550 @@
+import hashlib
+import json
+import mmap
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+# Limits for the in-process dataset cache. Datasets are evicted least recently
+# used first once the memory cap or entry count is exceeded, and dropped
+# entirely when they have not been touched for the TTL.
+MAX_CACHE_BYTES = int(os.environ.get('DATASET_CACHE_MAX_MB', '2048')) * 1024 * 1024
+MAX_CACHE_ENTRIES = int(os.environ.get('DATASET_CACHE_MAX_ENTRIES', '16'))
+CACHE_TTL_SECONDS = int(os.environ.get('DATASET_CACHE_TTL_SECONDS', '14400'))
+# Per-dataset results memoized by parameters (date range, filters, ...),
+# capped both in number and in memory
+MEMO_ENTRIES = int(os.environ.get('DATASET_MEMO_ENTRIES', '256'))
+MEMO_MAX_BYTES = int(os.environ.get('DATASET_MEMO_MAX_MB', '256')) * 1024 * 1024
+
+# Where ingested datasets are kept in columnar form, one directory per content
+# hash. Each column is a separate .npy file so reloads can memory-map them.
+DATASET_DIR = os.environ.get('DATASET_DIR', os.path.join(tempfile.gettempdir(), 'tech_dashboard_datasets'))
+# Bumped whenever the stored columns change; older datasets are then parsed
+# again from their upload (2: ages are no longer stored; 3: text dictionaries
+# in their own files, user_email and cf_jira_link categorical)
+COLUMNAR_FORMAT_VERSION = 3
+
+
+def content_key(raw_bytes):
+    return hashlib.sha256(raw_bytes).hexdigest()
+
+
+def is_valid_key(key):
+    # Keys end up in file paths and URLs, so only accept what content_key makes
+    return isinstance(key, str) and re.fullmatch(r'[0-9a-f]{64}', key) is not None
+
+
+def frame_nbytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def _is_mapped(array):
+    while array is not None:
+        if isinstance(array, (np.memmap, mmap.mmap)):
+            return True
+        array = getattr(array, 'base', None)
+    return False
+
+def _column_bytes(series):
+    """(heap bytes, memory-mapped bytes) of one column."""
+    total = int(series.memory_usage(index=False, deep=True))
+    buffer = series.array.codes if isinstance(series.dtype, pd.CategoricalDtype) else np.asarray(series.array)
+    mapped = buffer.nbytes if _is_mapped(buffer) else 0
+    return total - mapped, mapped
+
+def _value_nbytes(value):
+    if isinstance(value, pd.DataFrame):
+        return frame_nbytes(value)
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, (list, tuple)):
+        return sum(map(_value_nbytes, value))
+    return getattr(value, 'nbytes', 0)
+
+
+class TextColumn:
+    """A text column of a stored dataset, left on disk and decoded by row.
+
+    Codes and dictionary (offsets into one UTF-8 buffer) are memory-mapped,
+    so an unused column costs no memory and a table page only decodes the
+    values on it.
+    """
+
+    def __init__(self, codes, offsets, chars):
+        self.codes = codes
+        self.offsets = offsets
+        self.chars = chars
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.offsets.nbytes + self.chars.nbytes
+
+    def take(self, rows):
+        """Values at row positions rows, as Python strings (NaN where missing)."""
+        # Each distinct value is decoded once
+        uniques, inverse = np.unique(np.asarray(self.codes[rows]), return_inverse=True)
+        values = np.empty(len(uniques), dtype=object)
+        for i, code in enumerate(uniques.tolist()):
+            values[i] = (np.nan if code < 0 else
+                         bytes(self.chars[self.offsets[code]:self.offsets[code + 1]]).decode('utf-8'))
+        return values[inverse.ravel()]
+
+
+class Dataset:
+    """A loaded export plus the structures derived from it.
+
+    Derived structures (aggregate cubes, indexes, ...) are built on first use
+    and then live as long as the dataset stays cached. Free-text columns the
+    dashboard does not aggregate can stay on disk as text_columns, out of df;
+    with_columns adds them to the rows that need them. columns is the order
+    of every column, in df or not.
+
+    on_resize, if set, is called with the dataset whenever a derived
+    structure or memoized result is added to it.
+    """
+
+    def __init__(self, key, df, text_columns=None, columns=None):
+        self.key = key
+        self.df = df
+        self.text_columns = text_columns or {}
+        self.columns = list(df.columns) if columns is None else list(columns)
+        self._derived = {}
+        self._memo = OrderedDict()  # params -> (value, nbytes)
+        self._memo_bytes = 0
+        self._memo_lock = threading.Lock()
+        self._df_nbytes = None
+        self.on_resize = None
+
+    @property
+    def nbytes(self):
+        if self._df_nbytes is None:
+            self._df_nbytes = frame_nbytes(self.df)
+        return self._df_nbytes + sum(map(_value_nbytes, list(self._derived.values()))) + self._memo_bytes
+
+    def memory_usage(self):
+        """Bytes held for the dataset, by part.
+
+        'heap' and 'mapped' split the columns of df into private memory and
+        memory-mapped files (shared by every worker, and paged out under
+        pressure); 'derived' is the cube and indexes, 'memo' the cached
+        results. 'disk' is the text columns left on disk, not in memory.
+        """
+        heap = mapped = 0
+        for _, series in self.df.items():
+            column_heap, column_mapped = _column_bytes(series)
+            heap += column_heap
+            mapped += column_mapped
+        with self._memo_lock:
+            memo = self._memo_bytes
+        return {
+            'heap': heap + int(self.df.index.memory_usage()),
+            'mapped': mapped,
+            'derived': sum(map(_value_nbytes, list(self._derived.values()))),
+            'memo': memo,
+            'disk': sum(column.nbytes for column in self.text_columns.values()),
+        }
+
+    def with_columns(self, frame, columns=None):
+        """frame, rows of df indexed by position, with its text columns added.
+
+        Only the rows of frame are decoded. columns picks and orders the
+        result; by default it is every column of the dataset followed by the
+        columns frame adds (e.g. ages).
+        """
+        if columns is None:
+            columns = self.columns + [col for col in frame.columns if col not in self.columns]
+        # A column asked for twice is returned once
+        columns = list(dict.fromkeys(columns))
+        missing = [col for col in columns if col not in frame and col in self.text_columns]
+        if missing:
+            rows = frame.index.to_numpy()
+            frame = frame.assign(**{col: self.text_columns[col].take(rows) for col in missing})
+        return frame[[col for col in columns if col in frame]]
+
+    def derived(self, name, builder):
+        if name not in self._derived:
+            self._derived[name] = builder(self.df)
+            self._resized()
+        return self._derived[name]
+
+    def memoized(self, params, compute):
+        """Return compute(), cached under the hashable params (LRU-bounded)."""
+        with self._memo_lock:
+            if params in self._memo:
+                self._memo.move_to_end(params)
+                return self._memo[params][0]
+        value = compute()
+        nbytes = _value_nbytes(value)
+        with self._memo_lock:
+            if params in self._memo:
+                self._memo_bytes -= self._memo.pop(params)[1]
+            self._memo[params] = (value, nbytes)
+            self._memo_bytes += nbytes
+            # Always keep the newest result, even if it alone exceeds the cap
+            while len(self._memo) > 1 and (
+                len(self._memo) > MEMO_ENTRIES or self._memo_bytes > MEMO_MAX_BYTES
+            ):
+                _, (_, evicted_bytes) = self._memo.popitem(last=False)
+                self._memo_bytes -= evicted_bytes
+        self._resized()
+        return value
+
+    def _resized(self):
+        if self.on_resize is not None:
+            self.on_resize(self)
+
+
+class DatasetStore:
+    """Thread-safe LRU/TTL cache of loaded Datasets keyed by upload hash."""
+
+    def __init__(self, max_bytes=MAX_CACHE_BYTES, max_entries=MAX_CACHE_ENTRIES, ttl=CACHE_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> [dataset, nbytes, last_access]
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def get(self, key):
+        if key is None:
+            return None
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry[2] = time.monotonic()
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, dataset):
+        key = dataset.key
+        nbytes = dataset.nbytes
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = [dataset, nbytes, time.monotonic()]
+            self._total_bytes += nbytes
+            self._expire()
+            self._evict()
+        # Datasets grow as results are cached on them, so their size is
+        # counted again each time
+        dataset.on_resize = self._resize
+        return dataset
+
+    def _resize(self, dataset):
+        nbytes = dataset.nbytes
+        with self._lock:
+            entry = self._entries.get(dataset.key)
+            if entry is None or entry[0] is not dataset:
+                return
+            self._total_bytes += nbytes - entry[1]
+            entry[1] = nbytes
+            self._evict()
+
+    def _evict(self):
+        # Always keep the newest entry, even if it alone exceeds the cap
+        while len(self._entries) > 1 and (
+            self._total_bytes > self.max_bytes or len(self._entries) > self.max_entries
+        ):
+            _, (_, evicted_bytes, _) = self._entries.popitem(last=False)
+            self._total_bytes -= evicted_bytes
+
+    def datasets(self):
+        """The cached datasets, least recently used first."""
+        with self._lock:
+            self._expire()
+            return [entry[0] for entry in self._entries.values()]
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        for key in [k for k, entry in self._entries.items() if entry[2] < cutoff]:
+            self._total_bytes -= self._entries.pop(key)[1]
+
+
+def _dataset_path(key, part=None):
+    # A dataset's derived frames (part) live in subdirectories of its own
+    path = os.path.join(DATASET_DIR, key)
+    return path if part is None else os.path.join(path, part)
+
+
+def file_content_key(path, block_size=1024 * 1024):
+    """content_key of a file's bytes, read block by block."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _column_kind(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return 'category'
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return 'datetime'
+    if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+        return 'numeric'
+    return 'text'
+
+
+def _code_dtype(n_values):
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_values < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+class _ColumnBuilder:
+    """One column of a ColumnarWriter, appended to a raw file chunk by chunk.
+
+    Categorical and text columns share one dictionary across chunks. A numeric
+    column that later turns out to hold text (or a wider dtype) is rewritten
+    once, block by block.
+    """
+
+    BLOCK_ROWS = 1_000_000
+
+    def __init__(self, path, name):
+        self.path = path
+        self.name = name
+        self.kind = None
+        self.dtype = None
+        self.rows = 0
+        self._lookup = None  # value -> code, in code order
+        self._file = open(path, 'wb')
+
+    def append(self, series):
+        kind = _column_kind(series)
+        if self.kind is None:
+            self.kind = kind
+            if kind in ('category', 'text'):
+                self._lookup = {}
+                self.dtype = np.dtype(np.int32)
+            elif kind == 'datetime':
+                self.dtype = np.dtype(np.int64)
+        elif self.kind == 'numeric' and kind == 'text':
+            self._lookup = {}
+            self._rewrite(np.dtype(np.int32), self._numeric_to_codes)
+            self.kind = 'text'
+
+        if self.kind in ('category', 'text'):
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
+            else:
+                codes, uniques = pd.factorize(series.astype(object), use_na_sentinel=True)
+            values = self._encode(uniques)[codes]
+        elif self.kind == 'datetime':
+            values = series.to_numpy(dtype='datetime64[ns]').view('int64')
+        else:
+            values = series.to_numpy()
+            dtype = values.dtype if self.dtype is None else np.result_type(self.dtype, values.dtype)
+            if self.dtype is not None and dtype != self.dtype:
+                self._rewrite(dtype, lambda block: block.astype(dtype))
+            self.dtype = dtype
+        self._file.write(np.ascontiguousarray(values, dtype=self.dtype).tobytes())
+        self.rows += len(series)
+
+    def _encode(self, uniques):
+        # Chunk-local codes -> global codes; the trailing -1 keeps missing values missing
+        lookup = self._lookup
+        codes = np.empty(len(uniques) + 1, dtype=np.int32)
+        for i, value in enumerate(uniques):
+            value = value.item() if hasattr(value, 'item') else value
+            codes[i] = lookup.setdefault(value, len(lookup))
+        codes[-1] = -1
+        return codes
+
+    def _numeric_to_codes(self, block):
+        missing = pd.isna(block)
+        codes, uniques = pd.factorize(block[~missing].astype(object))
+        values = np.full(len(block), -1, dtype=np.int32)
+        values[~missing] = self._encode(uniques)[codes]
+        return values
+
+    def _rewrite(self, dtype, convert):
+        self._file.close()
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as out:
+            for block in self._blocks():
+                out.write(np.ascontiguousarray(convert(block), dtype=dtype).tobytes())
+        os.replace(tmp_path, self.path)
+        self.dtype = dtype
+        self._file = open(self.path, 'ab')
+
+    def _blocks(self):
+        if self.rows == 0:
+            return
+        values = np.memmap(self.path, dtype=self.dtype, mode='r', shape=(self.rows,))
+        for start in range(0, self.rows, self.BLOCK_ROWS):
+            yield np.array(values[start:start + self.BLOCK_ROWS])
+
+    def finish(self, npy_path):
+        """Write the column as an .npy file and return its meta.json entry."""
+        self._file.close()
+        column = {'name': self.name, 'file': os.path.basename(npy_path), 'kind': self.kind}
+        dtype = self.dtype
+        if self._lookup is not None:
+            if self.kind == 'text':
+                column['dictionary'] = self._write_dictionary(npy_path)
+            else:
+                column['categories'] = list(self._lookup)
+            # Codes are stored as narrow as the dictionary allows
+            dtype = _code_dtype(len(self._lookup))
+        if self.rows == 0:
+            np.save(npy_path, np.empty(0, dtype=dtype or np.float64), allow_pickle=False)
+        else:
+            out = np.lib.format.open_memmap(npy_path, mode='w+', dtype=dtype, shape=(self.rows,))
+            start = 0
+            for block in self._blocks():
+                out[start:start + len(block)] = block
+                start += len(block)
+            out.flush()
+            del out
+        os.remove(self.path)
+        return column
+
+    def _write_dictionary(self, npy_path):
+        # Text values go to one UTF-8 buffer plus offsets, both memory-mappable,
+        # so a reader can decode single values without loading the others
+        encoded = [str(value).encode('utf-8') for value in self._lookup]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        stem = npy_path[:-len('.npy')]
+        np.save(f'{stem}.offsets.npy', offsets, allow_pickle=False)
+        np.save(f'{stem}.chars.npy', np.frombuffer(b''.join(encoded), dtype=np.uint8), allow_pickle=False)
+        return [os.path.basename(f'{stem}.offsets.npy'), os.path.basename(f'{stem}.chars.npy')]
+
+
+class ColumnarWriter:
+    """Writes a dataset to DATASET_DIR/<key> from a stream of DataFrame chunks.
+
+    Memory use is bounded by the chunk size (plus the dictionaries of the
+    categorical and text columns), not by the size of the dataset. With part,
+    the frame is written to DATASET_DIR/<key>/<part> instead, next to the
+    (already written) dataset it was derived from.
+    """
+
+    def __init__(self, key, part=None):
+        self.key = key
+        self.part = part
+        self.rows = 0
+        parent = os.path.dirname(_dataset_path(key, part))
+        os.makedirs(parent, exist_ok=True)
+        self._dir = tempfile.mkdtemp(prefix=f'.{part or key}-', dir=parent)
+        self._columns = None
+
+    def append(self, df):
+        if self._columns is None:
+            self._columns = [_ColumnBuilder(os.path.join(self._dir, f'{i}.raw'), name)
+                             for i, name in enumerate(df.columns)]
+        for column, (_, series) in zip(self._columns, df.items()):
+            column.append(series)
+        self.rows += len(df)
+
+    def close(self):
+        columns = [column.finish(os.path.join(self._dir, f'{i}.npy'))
+                   for i, column in enumerate(self._columns or [])]
+        meta = {'version': COLUMNAR_FORMAT_VERSION, 'rows': self.rows, 'columns': columns}
+        with open(os.path.join(self._dir, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        target = _dataset_path(self.key, self.part)
+        if os.path.isdir(target) and _format_version(target) != COLUMNAR_FORMAT_VERSION:
+            # Written in an older format, which nothing reads any more
+            shutil.rmtree(target, ignore_errors=True)
+        # Publish atomically so concurrent readers never see a half-written dataset
+        try:
+            os.rename(self._dir, target)
+        except OSError:
+            shutil.rmtree(self._dir, ignore_errors=True)
+
+    def abort(self):
+        for column in self._columns or []:
+            column._file.close()
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+
+def _format_version(path):
+    try:
+        with open(os.path.join(path, 'meta.json')) as f:
+            return json.load(f).get('version')
+    except (OSError, ValueError):
+        return None
+
+def save_columnar(key, df, part=None):
+    """Write df to DATASET_DIR/<key>[/<part>] as one .npy file per column.
+
+    Categorical and text columns are dictionary-encoded (integer codes on disk,
+    categories in meta.json, text values in files of their own); datetimes are
+    stored as int64 nanoseconds.
+    """
+    writer = ColumnarWriter(key, part)
+    try:
+        writer.append(df)
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+
+
+def open_columnar(key, part=None):
+    """Memory-map a dataset written by save_columnar, leaving its text on disk.
+
+    Returns (df, text_columns, columns): the frame of every non-text column,
+    {name: TextColumn} for the text ones and the order of all of them; None
+    if nothing (current) is stored under key.
+    """
+    if not is_valid_key(key):
+        return None
+    path = _dataset_path(key, part)
+    try:
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get('version') != COLUMNAR_FORMAT_VERSION:
+        return None
+    data, text_columns = {}, {}
+    for column in meta['columns']:
+        values = np.load(os.path.join(path, column['file']), mmap_mode='r', allow_pickle=False)
+        kind = column['kind']
+        if kind == 'category':
+            data[column['name']] = pd.Categorical.from_codes(values, column['categories'])
+        elif kind == 'datetime':
+            data[column['name']] = pd.Series(values.view('datetime64[ns]'), copy=False)
+        elif kind == 'text':
+            offsets, chars = (np.load(os.path.join(path, name), mmap_mode='r', allow_pickle=False)
+                              for name in column['dictionary'])
+            text_columns[column['name']] = TextColumn(values, offsets, chars)
+        else:
+            data[column['name']] = pd.Series(values, copy=False)
+    df = pd.DataFrame(data, index=pd.RangeIndex(meta['rows']), copy=False)
+    return df, text_columns, [column['name'] for column in meta['columns']]
+
+
+def load_columnar(key, part=None):
+    """Memory-map a dataset written by save_columnar, or return None.
+
+    Text columns are decoded into plain Python objects (NaN for missing).
+    """
+    opened = open_columnar(key, part)
+    if opened is None:
+        return None
+    df, text_columns, columns = opened
+    return Dataset(key, df, text_columns, columns).with_columns(df)
+
+
+store = DatasetStore()
@@ -0,0 +1,115 @@
+import importlib.util
+import zlib
+from datetime import datetime
+from io import BytesIO
+from urllib.parse import urlencode
+
+from flask import Response, abort, request
+
+from aggregates import (
+    HIGH_AGE_COLUMNS, HIGH_AGE_HOURS, JIRA_TICKET_COLUMNS, age_hours, high_age_tickets, jira_tickets, resolve_as_of)
+from indexes import FILTER_KEYS, DatasetIndex, rows_for_filter
+from ingest import get_dataset
+
+
+# Rows rendered per CSV chunk while streaming a download
+CHUNK_ROWS = 50_000
+
+# Export name -> download filename prefix
+EXPORTS = {
+    'filtered': 'filtered_data',
+    'jira': 'jira_tickets',
+    'highage': 'high_age_tickets',
+}
+
+# Export name -> its columns, where not all of the dataset's (plus ages)
+EXPORT_COLUMNS = {
+    'jira': JIRA_TICKET_COLUMNS,
+    'highage': HIGH_AGE_COLUMNS,
+}
+
+FORMATS = {
+    'csv': 'text/csv',
+    'csv.gz': 'application/gzip',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+PARQUET_AVAILABLE = any(importlib.util.find_spec(name) for name in ('pyarrow', 'fastparquet'))
+
+
+# Query parameters of the reference time and threshold ages are computed with
+AGEING_PARAMS = ['as_of', 'as_of_time', 'hours']
+
+
+def download_url(key, export, spec=None, fmt='csv', ageing=None):
+    """URL that streams an export of the dataset stored under key.
+
+    For the 'filtered' export, spec is a filter spec as understood by
+    indexes.rows_for_filter and travels in the query string, as does ageing,
+    a dict of AGEING_PARAMS; without 'as_of' ages are those at download time.
+    """
+    url = f'/download/{key}/{export}.{fmt}'
+    params = dict(spec or {})
+    params.update({k: v for k, v in (ageing or {}).items() if k in AGEING_PARAMS and v not in (None, '')})
+    if params:
+        url += '?' + urlencode(params)
+    return url
+
+def export_frame(dataset, export, spec, as_of, threshold_hours=HIGH_AGE_HOURS):
+    df = dataset.df
+    if export == 'jira':
+        return jira_tickets(df, as_of)
+    if export == 'highage':
+        return high_age_tickets(df, as_of, threshold_hours)
+    rows = rows_for_filter(dataset.derived('index', DatasetIndex), spec)
+    filtered = df.iloc[rows]
+    return filtered.assign(age_hours=age_hours(filtered['created_at'], as_of))
+
+def _csv_chunks(df, finish):
+    # finish adds the free-text columns, one chunk at a time
+    yield finish(df.iloc[:0]).to_csv(index=False).encode('utf-8')
+    for start in range(0, len(df), CHUNK_ROWS):
+        yield finish(df.iloc[start:start + CHUNK_ROWS]).to_csv(index=False, header=False).encode('utf-8')
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def init_app(server):
+    @server.route('/download/<key>/<filename>')
+    def download(key, filename):
+        export, _, fmt = filename.partition('.')
+        if export not in EXPORTS or fmt not in FORMATS:
+            abort(404)
+        if fmt == 'parquet' and not PARQUET_AVAILABLE:
+            abort(404)
+        dataset = get_dataset(key)
+        if dataset is None:
+            abort(404)
+        spec = {k: v for k, v in request.args.items() if k in FILTER_KEYS}
+        try:
+            as_of = resolve_as_of(request.args.get('as_of'), request.args.get('as_of_time'))
+            threshold_hours = float(request.args.get('hours', HIGH_AGE_HOURS))
+            # A malformed day/week/month in spec is also the request's fault
+            df = export_frame(dataset, export, spec, as_of, threshold_hours)
+        except ValueError:
+            abort(400)
+        columns = EXPORT_COLUMNS.get(export)
+
+        def finish(frame):
+            return dataset.with_columns(frame, columns)
+
+        name = f'{EXPORTS[export]}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{fmt}'
+        headers = {'Content-Disposition': f'attachment; filename="{name}"'}
+        if fmt == 'parquet':
+            buffer = BytesIO()
+            finish(df).to_parquet(buffer, index=False)
+            return Response(buffer.getvalue(), mimetype=FORMATS[fmt], headers=headers)
+        chunks = _csv_chunks(df, finish)
+        if fmt == 'csv.gz':
+            chunks = _gzip_chunks(chunks)
+        return Response(chunks, mimetype=FORMATS[fmt], headers=headers)
@@ -0,0 +1,129 @@
+import functools
+import os
+
+import plotly.graph_objects as go
+import plotly.io as pio
+
+import aggregates
+from metrics import phase
+
+
+# Time-series charts are bucketed by day, week or month so no trace has more
+# than TIMESERIES_MAX_POINTS points, and drawn with WebGL (Scattergl) once the
+# whole figure has more than WEBGL_POINT_THRESHOLD points.
+TIMESERIES_MAX_POINTS = int(os.environ.get('TIMESERIES_MAX_POINTS', '400'))
+WEBGL_POINT_THRESHOLD = int(os.environ.get('WEBGL_POINT_THRESHOLD', '1000'))
+
+# The look of plotly's default template, cut down to what these charts use.
+# The full template (defaults for every trace type) is embedded in each
+# figure and was most of its JSON.
+_PLOTLY_LAYOUT = pio.templates['plotly'].layout
+TEMPLATE = go.layout.Template(
+    layout={name: _PLOTLY_LAYOUT[name] for name in (
+        'colorway', 'font', 'hovermode', 'hoverlabel', 'paper_bgcolor', 'plot_bgcolor', 'xaxis', 'yaxis', 'title')},
+    data={'bar': [go.Bar(marker_line_color='#E5ECF6', marker_line_width=0.5)], 'pie': [go.Pie(automargin=True)]},
+)
+COLORWAY = list(_PLOTLY_LAYOUT.colorway)
+
+
+def _data(aggregate, cube):
+    with phase('aggregate'):
+        return aggregate(cube)
+
+@functools.lru_cache(maxsize=None)
+def _layout(title, x_title=None, y_title=None, legend_title=None, **kwargs):
+    """The (immutable) layout of one chart, built once per process."""
+    layout = dict(template=TEMPLATE, title_text=title, clickmode='event+select', margin_t=60, **kwargs)
+    if x_title is not None:
+        layout.update(xaxis_title_text=x_title, yaxis_title_text=y_title)
+    if legend_title is not None:
+        layout.update(legend_title_text=legend_title)
+    return go.Layout(**layout)
+
+def _figure(traces, *layout_args, **layout_kwargs):
+    return go.Figure(data=traces, layout=_layout(*layout_args, **layout_kwargs))
+
+def _pie(data, names, title):
+    return _figure([go.Pie(labels=data[names], values=data['Count'],
+                           hovertemplate='%{label}<br>Count=%{value}<extra></extra>')], title)
+
+def _bar(data, x, y, title, colors=False):
+    # One trace for all bars; distinct colours come from the marker, not from one trace per bar
+    marker = {'color': [COLORWAY[i % len(COLORWAY)] for i in range(len(data))]} if colors else None
+    return _figure([go.Bar(x=data[x], y=data[y], marker=marker,
+                           hovertemplate=f'%{{x}}<br>{y}=%{{y}}<extra></extra>')], title, x, y)
+
+def _traces(data, color, make_trace):
+    # One trace per value of the colour column, in order of first appearance
+    return [make_trace(str(name), group) for name, group in data.groupby(color, sort=False, observed=True)]
+
+def _line_trace(data):
+    return go.Scattergl if len(data) > WEBGL_POINT_THRESHOLD else go.Scatter
+
+def tickets_by_date_figure(cube):
+    period = aggregates.choose_period(cube, TIMESERIES_MAX_POINTS)
+    data = _data(lambda c: aggregates.tickets_by_date_status(c, period), cube)
+    trace = _line_trace(data)
+    return _figure(_traces(data, 'status_label', lambda name, group: trace(
+        x=group['date_formatted'], y=group['Tickets'], name=name, mode='lines',
+        customdata=group[['ticket_status', 'period']].astype(str).to_numpy(),
+        hovertemplate=f'{name}<br>%{{x}}<br>Tickets=%{{y}}<extra></extra>',
+    )), 'Total Created Tickets by Date (Status-wise, with Counts)', 'date_formatted', 'Tickets', 'status_label')
+
+def status_figure(cube):
+    return _pie(_data(aggregates.status_counts, cube), 'ticket_status_label', 'Open vs Closed Status (with Counts)')
+
+def top_categories_figure(cube):
+    return _bar(_data(aggregates.top_categories, cube), 'CategoryLabel', 'Count',
+                'Top Tech Issue Categories (with Counts)', colors=True)
+
+def top_subcategories_figure(cube):
+    return _bar(_data(aggregates.top_subcategories, cube), 'SubCategoryLabel', 'Count',
+                'Top Tech Sub-Categories (with Counts)', colors=True)
+
+def agent_closed_figure(cube):
+    return _bar(_data(aggregates.agent_closed, cube), 'Agent', 'Closed Tickets', 'Agent Closed Tickets')
+
+def tech_issue_figure(cube):
+    return _pie(_data(aggregates.tech_issue_counts, cube), 'cf_is_tech_issue_label', 'Tech Issue (Yes/No) Count (with Counts)')
+
+def knowledge_gap_figure(cube):
+    return _pie(_data(aggregates.knowledge_gap_counts, cube), 'cf_knowledge_gap_label',
+                'Knowledge Gap (Yes/No) Count (with Counts)')
+
+def week_comparison_figure(cube):
+    period = aggregates.choose_period(cube, TIMESERIES_MAX_POINTS, periods=('week', 'month'))
+    data = _data(lambda c: aggregates.week_counts(c, period), cube)
+    trace = _line_trace(data)
+    return _figure(_traces(data, 'year', lambda name, group: trace(
+        x=group['week_label'], y=group['Tickets'], name=name, mode='lines',
+        customdata=group[['year', 'period']].astype(str).to_numpy(),
+        hovertemplate=f'{name}<br>%{{x}}<br>Tickets=%{{y}}<extra></extra>',
+    )), 'Week-over-Week Ticket Creation', 'week_label', 'Tickets', 'year')
+
+def last4_weeks_figure(cube):
+    return _bar(_data(aggregates.last_4_weeks, cube), 'label', 'Tickets', 'Ticket Counts: Last 4 Weeks')
+
+def jira_week_status_figure(cube):
+    data = _data(aggregates.jira_week_status, cube)
+    return _figure(_traces(data, 'status_label', lambda name, group: go.Bar(
+        x=group['week_label'], y=group['Count'], name=name,
+        # The click handler reads the status group back from customdata
+        customdata=group['status_group'].str.capitalize().to_numpy()[:, None],
+        hovertemplate=f'{name}<br>%{{x}}<br>Count=%{{y}}<extra></extra>',
+    )), 'Jira Tickets by Status (Week-wise, including Total)', 'week_label', 'Count', 'status_label', barmode='group')
+
+
+# Graph id on the Dashboard tab -> figure builder, in display order
+FIGURES = {
+    'tickets-by-date-graph': tickets_by_date_figure,
+    'status-pie-graph': status_figure,
+    'top-categories-graph': top_categories_figure,
+    'top-subcategories-graph': top_subcategories_figure,
+    'agent-closed-graph': agent_closed_figure,
+    'tech-issue-graph': tech_issue_figure,
+    'knowledge-gap-graph': knowledge_gap_figure,
+    'week-comparison-graph': week_comparison_figure,
+    'last4-weeks-graph': last4_weeks_figure,
+    'jira-week-status-graph': jira_week_status_figure,
+}
@@ -0,0 +1,30 @@
+# Production serving: gunicorn -c gunicorn.conf.py dashboard:server
+#
+# Every worker keeps its own in-memory dataset cache, but all of them share
+# the columnar files under DATASET_DIR, so an upload parsed by one worker is
+# memory-mapped (not re-parsed) by the others.
+import multiprocessing
+import os
+
+bind = f"{os.environ.get('DASH_HOST', '0.0.0.0')}:{os.environ.get('DASH_PORT', '8050')}"
+workers = int(os.environ.get('WEB_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.environ.get('WEB_THREADS', '4'))
+worker_class = 'gthread'
+# Requests no longer parse exports: large files arrive in chunks through
+# /upload, small ones are staged to disk by a short callback, and parsing and
+# appends run as background jobs. With gthread workers the timeout is not a
+# limit on a single request anyway; it restarts a worker that stops checking
+# in with the master. The margin is kept for BACKGROUND_CALLBACKS=0, where a
+# large parse runs inside the callback request.
+timeout = int(os.environ.get('WEB_TIMEOUT', '300'))
+keepalive = 5
+# Import the app once in the master and fork the workers from it, so scaling
+# out pays for the imports once instead of once per worker
+preload_app = os.environ.get('WEB_PRELOAD', '1') != '0'
+accesslog = '-'
+
+
+def on_starting(server):
+    # Callback metrics are merged from per-process files; start from zero
+    import metrics
+    metrics.reset()
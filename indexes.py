@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+from aggregates import JIRA_STATUS_GROUPS, has_jira_link, month_bounds, week_bounds
+
+
+# Columns the chart drill-downs filter on
+INDEXED_COLUMNS = [
+    'ticket_status', 'cf_tech_issue_category', 'cf_cf_tech_issue_category_sub-category',
+    'agent_name', 'cf_is_tech_issue', 'cf_knowledge_gap']
+
+# Keys of a filter spec besides the indexed columns: 'day' (yyyy-mm-dd),
+# 'week' (dd-mm-yyyy Monday), 'month' (mm-yyyy), 'jira' (any value) and
+# 'status_group' (a JIRA_STATUS_GROUPS bucket)
+FILTER_KEYS = INDEXED_COLUMNS + ['day', 'week', 'month', 'jira', 'status_group']
+
+_NO_ROWS = np.empty(0, dtype=np.int32)
+
+
+def _position_dtype(n_rows):
+    # Row positions are stored as narrow as the row count allows
+    return np.int32 if n_rows <= np.iinfo(np.int32).max else np.int64
+
+def _postings(values):
+    # value -> ascending row positions, from one factorize and one stable sort
+    codes, uniques = pd.factorize(values)
+    order = np.argsort(codes, kind='stable').astype(_position_dtype(len(codes)), copy=False)
+    sizes = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    # Missing values (code -1) sort first; skip past them
+    bounds = np.concatenate([[0], np.cumsum(sizes)]) + np.count_nonzero(codes < 0)
+    return {value: order[bounds[i]:bounds[i + 1]] for i, value in enumerate(uniques)}
+
+
+class DatasetIndex:
+    """Row-position indexes over a dataset, built once at load time.
+
+    Every lookup returns a sorted array of row positions, so compound filters
+    are just intersections and df.iloc[positions] keeps the original order.
+    The same indexes over the aggregate cube (time_column='date') filter the
+    cube itself.
+    """
+
+    def __init__(self, df, time_column='created_at'):
+        self.n_rows = len(df)
+        self.postings = {col: _postings(df[col]) for col in INDEXED_COLUMNS if col in df}
+        # The cube carries the Jira flag as a column
+        jira = df['has_jira'] if 'has_jira' in df else has_jira_link(df)
+        positions = _position_dtype(self.n_rows)
+        self.jira_rows = np.flatnonzero(jira.to_numpy()).astype(positions, copy=False)
+        created = df[time_column].to_numpy(dtype='datetime64[ns]')
+        # NaT sorts last, so searchsorted never returns rows without a date
+        self._time_order = np.argsort(created, kind='stable').astype(positions, copy=False)
+        self._sorted_times = created[self._time_order]
+
+    @property
+    def nbytes(self):
+        total = self.jira_rows.nbytes + self._time_order.nbytes + self._sorted_times.nbytes
+        for postings in self.postings.values():
+            total += sum(rows.nbytes for rows in postings.values())
+        return total
+
+    def rows(self, column, value):
+        return self.postings.get(column, {}).get(value, _NO_ROWS)
+
+    def rows_where(self, column, predicate):
+        """Rows whose value in column satisfies predicate, e.g. a case-insensitive match."""
+        matches = [rows for value, rows in self.postings.get(column, {}).items() if predicate(value)]
+        if not matches:
+            return _NO_ROWS
+        return np.sort(np.concatenate(matches))
+
+    def rows_between(self, start, end):
+        """Rows created in [start, end)."""
+        lo = self._sorted_times.searchsorted(np.datetime64(start, 'ns'), side='left')
+        hi = self._sorted_times.searchsorted(np.datetime64(end, 'ns'), side='left')
+        return np.sort(self._time_order[lo:hi])
+
+    def rows_before(self, end):
+        """Rows created before end."""
+        hi = self._sorted_times.searchsorted(np.datetime64(end, 'ns'), side='left')
+        return np.sort(self._time_order[:hi])
+
+    def rows_on_day(self, day):
+        start = pd.Timestamp(day).normalize()
+        return self.rows_between(start, start + pd.Timedelta(days=1))
+
+    def rows_in_week(self, week_label):
+        return self.rows_between(*week_bounds(week_label))
+
+    def rows_in_month(self, month_label):
+        return self.rows_between(*month_bounds(month_label))
+
+
+def intersect(*row_sets):
+    # Smallest set first; every later (sorted) set is only probed for the
+    # survivors, so stacking filters costs about the size of the narrowest one
+    row_sets = sorted(row_sets, key=len)
+    result = row_sets[0]
+    for rows in row_sets[1:]:
+        if not len(result):
+            break
+        positions = rows.searchsorted(result)
+        found = positions < len(rows)
+        result = result[found][rows[positions[found]] == result[found]]
+    return result
+
+def cube_index(cube):
+    return DatasetIndex(cube, time_column='date')
+
+def rows_for_filter(index, spec):
+    """Row positions matching every condition of a filter spec dict."""
+    row_sets = []
+    for column in INDEXED_COLUMNS:
+        if column in spec:
+            row_sets.append(index.rows(column, spec[column]))
+    if 'day' in spec:
+        row_sets.append(index.rows_on_day(spec['day']))
+    if 'week' in spec:
+        row_sets.append(index.rows_in_week(spec['week']))
+    if 'month' in spec:
+        row_sets.append(index.rows_in_month(spec['month']))
+    if 'jira' in spec:
+        row_sets.append(index.jira_rows)
+    if 'status_group' in spec:
+        group = spec['status_group']
+        row_sets.append(index.rows_where(
+            'ticket_status', lambda value: JIRA_STATUS_GROUPS.get(str(value).lower()) == group))
+    if not row_sets:
+        return np.arange(index.n_rows)
+    return intersect(*row_sets)
@@ -0,0 +1,254 @@
+import io
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from aggregates import TOP_N_MODE, build_cube, build_daily_counts, daily_top, merge_cubes, update_cube
+from datastore import (
+    ColumnarWriter, Dataset, content_key, file_content_key, load_columnar, open_columnar, save_columnar, store)
+from indexes import DatasetIndex
+
+
+# Columns kept as pandas categoricals in memory and on disk: the chart
+# dimensions, plus the repetitive text the Insights tables read. Any other
+# text column (free text such as title or last_agent_assignment) stays on disk
+# once ingested and is only decoded for the table rows or exports showing it.
+CATEGORY_COLUMNS = [
+    'ticket_status', 'cf_tech_issue_category', 'cf_cf_tech_issue_category_sub-category',
+    'agent_name', 'cf_is_tech_issue', 'cf_knowledge_gap', 'user_email', 'cf_jira_link']
+
+
+# Rows parsed at a time when ingesting an export from a file
+INGEST_CHUNK_ROWS = int(os.environ.get('INGEST_CHUNK_ROWS', '100000'))
+
+CREATED_AT_FORMAT = '%d-%m-%Y %H:%M'
+
+# last_agent_assignment looks like "ID:12||Name:Jane Doe||Group:L1"; the agent is
+# the text after the first "Name:" up to the next "||" (or "Name:")
+AGENT_NAME_PATTERN = r'(?s)Name:(.*?)(?:\|\||Name:|$)'
+
+# Positions of the digits in a "dd-mm-yyyy HH:MM" string
+_DIGIT_POSITIONS = [0, 1, 3, 4, 6, 7, 8, 9, 11, 12, 14, 15]
+
+
+def parse_created_at(values):
+    """Parse dd-mm-yyyy HH:MM timestamps, NaT where unparseable.
+
+    Well-formed values are decoded straight from their bytes, with only the
+    distinct calendar dates going through pandas; anything else falls back to
+    pd.to_datetime with the same format.
+    """
+    values = pd.Series(values).reset_index(drop=True)
+    try:
+        raw = values.to_numpy(dtype='S17')
+    except (UnicodeError, ValueError, TypeError):
+        return pd.to_datetime(values, format=CREATED_AT_FORMAT, errors='coerce')
+    chars = raw.view(np.uint8).reshape(len(raw), 17)
+    digits = chars[:, :16].astype(np.int64) - ord('0')
+    well_formed = (
+        (chars[:, 16] == 0)
+        & (chars[:, 2] == ord('-')) & (chars[:, 5] == ord('-'))
+        & (chars[:, 10] == ord(' ')) & (chars[:, 13] == ord(':'))
+        & ((digits[:, _DIGIT_POSITIONS] >= 0) & (digits[:, _DIGIT_POSITIONS] <= 9)).all(axis=1)
+    )
+    yyyymmdd = (digits[:, 6] * 10_000_000 + digits[:, 7] * 1_000_000 + digits[:, 8] * 100_000
+                + digits[:, 9] * 10_000 + digits[:, 3] * 1_000 + digits[:, 4] * 100
+                + digits[:, 0] * 10 + digits[:, 1])
+    hours = digits[:, 11] * 10 + digits[:, 12]
+    minutes = digits[:, 14] * 10 + digits[:, 15]
+    well_formed &= (hours < 24) & (minutes < 60)
+
+    dates, inverse = np.unique(np.where(well_formed, yyyymmdd, 0), return_inverse=True)
+    parsed_dates = pd.to_datetime(pd.Series(dates).astype(str), format='%Y%m%d', errors='coerce')
+    result = (parsed_dates.to_numpy(dtype='datetime64[ns]')[inverse.ravel()]
+              + (hours * 60 + minutes).astype('timedelta64[m]'))
+    result[~well_formed] = np.datetime64('NaT')
+
+    parsed = pd.Series(result, index=values.index)
+    leftovers = ~well_formed & values.notna().to_numpy()
+    if leftovers.any():
+        parsed[leftovers] = pd.to_datetime(values[leftovers], format=CREATED_AT_FORMAT, errors='coerce')
+    return parsed
+
+def extract_agent_names(assignments):
+    """Vectorized agent-name parsing that only touches each distinct value once."""
+    codes, uniques = pd.factorize(assignments)
+    names = (pd.Series(uniques, dtype=object).astype(str)
+             .str.extract(AGENT_NAME_PATTERN, expand=False)
+             .str.strip()
+             .fillna("Unassigned"))
+    # Missing assignments have code -1, which picks the trailing "Unassigned"
+    names = np.append(names.to_numpy(dtype=object), "Unassigned")
+    name_codes, categories = pd.factorize(names)
+    return pd.Categorical.from_codes(name_codes[codes], categories)
+
+def preprocess(df):
+    # Parse dates with dd-mm-yyyy format explicitly, exactly once
+    df['created_at'] = parse_created_at(df['created_at']).set_axis(df.index)
+    df['agent_name'] = extract_agent_names(df['last_agent_assignment'])
+    # No ages here: they depend on when they are looked at (see aggregates.resolve_as_of)
+    for col in CATEGORY_COLUMNS:
+        if col in df and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    return df
+
+def read_export(raw):
+    # Low-cardinality columns are parsed straight into categoricals
+    df = pd.read_csv(io.BytesIO(raw), dtype={col: 'category' for col in CATEGORY_COLUMNS})
+    return preprocess(df)
+
+def concat_exports(first, second):
+    """Rows of first followed by those of second, keeping categoricals categorical."""
+    first, second = first.copy(), second.copy()
+    for col in first.columns.intersection(second.columns):
+        if isinstance(first[col].dtype, pd.CategoricalDtype) and isinstance(second[col].dtype, pd.CategoricalDtype):
+            old = first[col].cat.categories
+            categories = old.append(second[col].cat.categories.difference(old, sort=False))
+            first[col] = first[col].cat.set_categories(categories)
+            second[col] = second[col].cat.set_categories(categories)
+    return pd.concat([first, second], ignore_index=True)
+
+_open_lock = threading.Lock()
+
+# Directory (next to the columns) the aggregate cube is saved to, so
+# reopening a dataset does not rebuild it
+CUBE_PART = 'cube'
+
+def _save_cube(key, cube):
+    save_columnar(key, cube, part=CUBE_PART)
+    return cube
+
+def _open_dataset(key, df, text_columns=None, columns=None, cube=None):
+    dataset = Dataset(key, df, text_columns, columns)
+    if cube is not None:
+        dataset.derived('cube', lambda df: cube)
+    # Pay for the aggregate cube and drill-down indexes once, here, instead
+    # of on every chart refresh or click
+    dataset.derived('cube', build_cube)
+    dataset.derived('index', DatasetIndex)
+    customer_summary(dataset)
+    return store.put(dataset)
+
+def customer_summary(dataset, mode=TOP_N_MODE):
+    """Per-day ticket counts by email the top customers table is merged from.
+
+    mode 'exact' is every (day, email) count, 'approximate' only the largest
+    of each day (see aggregates.daily_top). Each is built from the rows the
+    first time its mode is used; datasets are opened with TOP_N_MODE's.
+    """
+    if mode == 'approximate':
+        return dataset.derived('customer-days-top', daily_top)
+    return dataset.derived('customer-days', build_daily_counts)
+
+def get_dataset(key):
+    """Return the Dataset for key, reopening it from disk if it was evicted."""
+    if not key:
+        return None
+    dataset = store.get(key)
+    if dataset is None:
+        # Concurrent callbacks for an evicted key open it once, not once each
+        with _open_lock:
+            dataset = store.get(key)
+            if dataset is None:
+                opened = open_columnar(key)
+                if opened is not None:
+                    cube = load_columnar(key, part=CUBE_PART)
+                    if cube is None:
+                        # Saved before cubes were kept on disk
+                        cube = _save_cube(key, build_cube(opened[0]))
+                    dataset = _open_dataset(key, *opened, cube=cube)
+    return dataset
+
+def _ingest(key, source, progress=None):
+    """Parse the export in the binary file object source, in chunks.
+
+    Each chunk of INGEST_CHUNK_ROWS rows is typed, appended to the columnar
+    files and reduced to a partial aggregate cube. Partial cubes are folded
+    into a running cube whenever they have as many rows as it has, so they
+    never hold more than the cube itself (whose size follows the distinct
+    days and dimension values) and each row is regrouped only a few times.
+    Peak memory thus depends on the chunk size and the cube rather than on
+    the size of the export. progress, if given, is called with (bytes read,
+    total bytes) after every chunk.
+    """
+    total = source.seek(0, io.SEEK_END)
+    source.seek(0)
+    writer = ColumnarWriter(key)
+    cube, pending = None, []
+
+    def fold(cube, pending):
+        cubes = pending if cube is None else [cube] + pending
+        # Empty frame with dimension dtypes covering the values of every cube
+        dtypes = cubes[0].iloc[:0]
+        for other in cubes[1:]:
+            dtypes = concat_exports(dtypes, other.iloc[:0])
+        return merge_cubes(cubes, dtypes)
+
+    try:
+        with pd.read_csv(source, dtype={col: 'category' for col in CATEGORY_COLUMNS},
+                         chunksize=INGEST_CHUNK_ROWS) as chunks:
+            for chunk in chunks:
+                chunk = preprocess(chunk)
+                writer.append(chunk)
+                pending.append(build_cube(chunk))
+                if sum(map(len, pending)) >= (0 if cube is None else len(cube)):
+                    cube, pending = fold(cube, pending), []
+                if progress is not None:
+                    progress(min(source.tell(), total), total)
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+    # Serve the memory-mapped copy so every session shares the same pages
+    df, text_columns, columns = open_columnar(key)
+    cube = _save_cube(key, merge_cubes([cube] + pending, df) if cube is not None else build_cube(df))
+    return _open_dataset(key, df, text_columns, columns, cube=cube)
+
+def load_upload(raw, progress=None):
+    """Return the Dataset for an uploaded export, parsing it at most once.
+
+    Lookups go memory cache -> columnar file on disk -> CSV parse, and a fresh
+    parse is written back to disk so later loads of the same content (from any
+    session) just memory-map it.
+    """
+    key = content_key(raw)
+    return get_dataset(key) or _ingest(key, io.BytesIO(raw), progress)
+
+def append_upload(base, raw, progress=None):
+    """Return the Dataset of base with the export in raw merged into it.
+
+    Only raw is parsed. Tickets already in base are replaced by their row in
+    raw (last write wins, e.g. for ticket_status), and the aggregate cube is
+    recomputed for the days the replaced and new rows fall on only.
+    progress, if given, is called with (steps done, 3).
+    """
+    progress = progress or (lambda done, total: None)
+    key = content_key(f'{base.key}+{content_key(raw)}'.encode())
+    dataset = get_dataset(key)
+    if dataset is not None:
+        return dataset
+    delta = read_export(raw).drop_duplicates('ticket_id', keep='last')
+    progress(1, 3)
+    # Non-numeric ticket ids are text, kept on disk rather than in base.df
+    ticket_ids = base.with_columns(base.df, ['ticket_id'])['ticket_id']
+    replaced = ticket_ids.isin(delta['ticket_id']).to_numpy()
+    df = concat_exports(base.with_columns(base.df[~replaced]), delta)
+    cube = update_cube(base.derived('cube', build_cube), base.df[replaced], delta, df)
+    progress(2, 3)
+    save_columnar(key, df)
+    _save_cube(key, cube)
+    progress(3, 3)
+    # Serve the memory-mapped copy, as load_upload does
+    opened = open_columnar(key)
+    return _open_dataset(key, *(opened or (df,)), cube=cube)
+
+def load_file(path, progress=None):
+    """Like load_upload, for an export stored at path."""
+    key = file_content_key(path)
+    dataset = get_dataset(key)
+    if dataset is None:
+        with open(path, 'rb') as source:
+            dataset = _ingest(key, source, progress)
+    return dataset
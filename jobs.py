@@ -0,0 +1,52 @@
+import importlib.util
+import os
+import tempfile
+
+from datastore import CACHE_TTL_SECONDS, COLUMNAR_FORMAT_VERSION
+
+
+# Heavy callbacks run as Dash background callbacks on a local diskcache-backed
+# manager when its packages are installed (pip install "dash[diskcache]").
+# Without them, or with BACKGROUND_CALLBACKS=0, they run inside the request.
+BACKGROUND_AVAILABLE = all(importlib.util.find_spec(name) for name in ('diskcache', 'multiprocess', 'psutil'))
+BACKGROUND_ENABLED = BACKGROUND_AVAILABLE and os.environ.get('BACKGROUND_CALLBACKS', '1') != '0'
+JOB_CACHE_DIR = os.environ.get('JOB_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'tech_dashboard_jobs'))
+# How often the browser polls a running job, in milliseconds
+JOB_POLL_INTERVAL_MS = 500
+
+
+def _make_manager():
+    if not BACKGROUND_ENABLED:
+        return None
+    import diskcache
+    from dash import DiskcacheManager
+    # Results are cached by callback arguments, so the same upload (or the
+    # same delta on the same dataset) is answered without starting a job
+    return DiskcacheManager(
+        diskcache.Cache(JOB_CACHE_DIR), cache_by=[lambda: COLUMNAR_FORMAT_VERSION], expire=CACHE_TTL_SECONDS)
+
+manager = _make_manager()
+
+
+def _no_progress(value):
+    pass
+
+def background_callback(app, *dependencies, progress=None, running=None, cancel=None, **kwargs):
+    """app.callback for slow work, run as a background job when possible.
+
+    The decorated function takes set_progress as its first argument either
+    way. Without a background manager it runs in the request, progress
+    updates are dropped and only the running outputs are applied.
+    """
+    def decorator(func):
+        if manager is not None:
+            return app.callback(
+                *dependencies, background=True, manager=manager, progress=progress, running=running,
+                cancel=cancel, interval=JOB_POLL_INTERVAL_MS, **kwargs)(func)
+
+        def run(*args):
+            return func(_no_progress, *args)
+        run.__name__ = func.__name__
+        app.callback(*dependencies, running=running, **kwargs)(run)
+        return func
+    return decorator
@@ -0,0 +1,319 @@
+import contextvars
+import fcntl
+import functools
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from flask import Response, g, has_request_context, request
+
+
+# Per-callback timings, sizes and row counts. Each process keeps its own
+# registry and writes it to METRICS_DIR at most every FLUSH_INTERVAL_SECONDS;
+# /metrics merges the files, so every gunicorn worker (and background job
+# process) shows up in one scrape.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+METRICS_LOG = os.environ.get('METRICS_LOG', '1') != '0'
+METRICS_DIR = os.environ.get('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'tech_dashboard_metrics'))
+FLUSH_INTERVAL_SECONDS = 1.0
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Prometheus metric name -> (type, help)
+METRICS = {
+    'dashboard_callback_duration_seconds': ('histogram', 'Wall time of a callback request, deserialize to serialize'),
+    'dashboard_callback_phase_seconds': ('summary', 'Time spent per callback phase (exclusive of nested phases)'),
+    'dashboard_callback_request_bytes': ('summary', 'Size of the callback request body'),
+    'dashboard_callback_response_bytes': ('summary', 'Size of the serialized callback response'),
+    'dashboard_callback_rows': ('summary', 'Rows a callback read or returned'),
+    'dashboard_callback_errors_total': ('counter', 'Callbacks that raised'),
+    'dashboard_dataset_bytes': ('gauge', 'Bytes a worker holds for a cached dataset, by part'),
+    'dashboard_sessions_active': ('gauge', 'Browser sessions with a dataset open'),
+}
+
+log = logging.getLogger('tech_dashboard.callbacks')
+if METRICS_LOG and not log.handlers:
+    _handler = logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    log.addHandler(_handler)
+    log.setLevel(logging.INFO)
+    log.propagate = False
+
+
+class _Registry:
+    """Counts and sums (plus histogram buckets) keyed by (metric, labels)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+        self._last_flush = 0.0
+
+    def observe(self, metric, labels, value, buckets=None):
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0, 0.0, [0] * len(buckets) if buckets else None]
+            series[0] += 1
+            series[1] += value
+            if buckets:
+                for i, bound in enumerate(buckets):
+                    if value <= bound:
+                        series[2][i] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return [[metric, list(labels), count, total, buckets and list(buckets)]
+                    for (metric, labels), (count, total, buckets) in self._series.items()]
+
+    def flush(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_flush < FLUSH_INTERVAL_SECONDS:
+            return
+        self._last_flush = now
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.flush-', dir=METRICS_DIR)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.snapshot() + _gauge_series(per_process=True), f)
+        os.replace(tmp_path, os.path.join(METRICS_DIR, f'{os.getpid()}.json'))
+
+registry = _Registry()
+
+_gauges = []  # [(collect, per_process)]
+
+
+def register_gauges(collect, per_process=True):
+    """Report the gauges collect() returns, as [(metric, labels, value)].
+
+    Per-process gauges are written with the process's other metrics,
+    labelled with its pid, and vanish when it exits; the others describe
+    state shared by every worker and are only collected by the process
+    serving /metrics.
+    """
+    _gauges.append((collect, per_process))
+
+def _gauge_series(per_process):
+    series = []
+    for collect, scope in _gauges:
+        if scope != per_process:
+            continue
+        for metric, labels, value in collect():
+            if per_process:
+                labels = dict(labels, pid=str(os.getpid()))
+            series.append([metric, sorted(labels.items()), 1, float(value), None])
+    return series
+
+
+class _Timing:
+    def __init__(self, name):
+        self.name = name
+        self.phases = defaultdict(float)
+        self.rows = None
+        self.error = False
+        self.started = self.ended = None
+        self._stack = []
+
+_current = contextvars.ContextVar('callback_timing', default=None)
+
+
+@contextmanager
+def phase(name):
+    """Attribute the time spent in the block to phase name of the running callback.
+
+    Nested phases are exclusive: an 'aggregate' block inside a 'figure' block
+    is only counted as 'aggregate'.
+    """
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    start = time.perf_counter()
+    timing._stack.append(0.0)
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        nested = timing._stack.pop()
+        timing.phases[name] += elapsed - nested
+        if timing._stack:
+            timing._stack[-1] += elapsed
+
+def record_rows(count):
+    timing = _current.get()
+    if timing is not None:
+        timing.rows = (timing.rows or 0) + int(count)
+
+def instrumented(func=None, *, name=None):
+    """Decorator timing a callback; use under @app.callback.
+
+    When called from a Dash request, the deserialize and serialize phases and
+    the request/response sizes are filled in by the hooks from init_app.
+    """
+    if func is None:
+        return functools.partial(instrumented, name=name)
+    if not METRICS_ENABLED:
+        return func
+    label = name or func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        timing = _Timing(label)
+        token = _current.set(timing)
+        timing.started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            timing.error = True
+            raise
+        finally:
+            timing.ended = time.perf_counter()
+            _current.reset(token)
+            # Background jobs are forked from a request thread and inherit its
+            # context, but the request's after_request hook runs in the parent
+            if has_request_context() and g.get('request_pid') == os.getpid():
+                g.callback_timing = timing
+            else:
+                _finish(timing)
+    return wrapper
+
+def _finish(timing, request_started=None, request_bytes=None, response_bytes=None):
+    phases = dict(timing.phases)
+    phases['other'] = max(timing.ended - timing.started - sum(phases.values()), 0.0)
+    total = timing.ended - timing.started
+    if request_started is not None:
+        phases['deserialize'] = timing.started - request_started
+        phases['serialize'] = time.perf_counter() - timing.ended
+        total = time.perf_counter() - request_started
+    labels = {'callback': timing.name}
+    registry.observe('dashboard_callback_duration_seconds', labels, total, DURATION_BUCKETS)
+    for phase_name, seconds in phases.items():
+        registry.observe('dashboard_callback_phase_seconds', dict(labels, phase=phase_name), seconds)
+    if request_bytes is not None:
+        registry.observe('dashboard_callback_request_bytes', labels, request_bytes)
+    if response_bytes is not None:
+        registry.observe('dashboard_callback_response_bytes', labels, response_bytes)
+    if timing.rows is not None:
+        registry.observe('dashboard_callback_rows', labels, timing.rows)
+    if timing.error:
+        registry.observe('dashboard_callback_errors_total', labels, 1)
+    registry.flush()
+    if METRICS_LOG:
+        log.info(json.dumps({
+            'event': 'callback', 'callback': timing.name, 'pid': os.getpid(),
+            'seconds': round(total, 6), 'phases': {k: round(v, 6) for k, v in phases.items()},
+            'request_bytes': request_bytes, 'response_bytes': response_bytes,
+            'rows': timing.rows, 'error': timing.error,
+        }))
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _merge(into, snapshot):
+    for metric, labels, count, total, buckets in snapshot:
+        key = (metric, tuple(tuple(pair) for pair in labels))
+        series = into.setdefault(key, [0, 0.0, [0] * len(buckets) if buckets else None])
+        series[0] += count
+        series[1] += total
+        if buckets:
+            series[2] = [a + b for a, b in zip(series[2], buckets)]
+
+def collect():
+    """Merge every process's metrics; files of exited processes are folded into retired.json."""
+    registry.flush(force=True)
+    merged, retired = {}, {}
+    with open(os.path.join(METRICS_DIR, '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        for entry in os.scandir(METRICS_DIR):
+            if not entry.name.endswith('.json'):
+                continue
+            try:
+                with open(entry.path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            stem = entry.name[:-len('.json')]
+            exited = stem == 'retired' or (stem.isdigit() and not _pid_alive(int(stem)))
+            if exited:
+                # What an exited process held is gone with it
+                snapshot = [series for series in snapshot if METRICS.get(series[0], ('',))[0] != 'gauge']
+            _merge(merged, snapshot)
+            if exited:
+                _merge(retired, snapshot)
+                if stem != 'retired':
+                    os.remove(entry.path)
+        if retired:
+            with open(os.path.join(METRICS_DIR, 'retired.json'), 'w') as f:
+                json.dump([[m, list(labels), c, t, b] for (m, labels), (c, t, b) in retired.items()], f)
+    _merge(merged, _gauge_series(per_process=False))
+    return merged
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in labels) + '}'
+
+def render(merged):
+    """Prometheus text exposition format."""
+    lines = []
+    by_metric = defaultdict(list)
+    for (metric, labels), series in sorted(merged.items()):
+        by_metric[metric].append((labels, series))
+    for metric, (kind, help_text) in METRICS.items():
+        if metric not in by_metric:
+            continue
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} {kind}')
+        for labels, (count, total, buckets) in by_metric[metric]:
+            if kind == 'counter':
+                lines.append(f'{metric}{_format_labels(labels)} {count}')
+                continue
+            if kind == 'gauge':
+                lines.append(f'{metric}{_format_labels(labels)} {total}')
+                continue
+            if buckets:
+                for bound, bucket_count in zip(DURATION_BUCKETS, buckets):
+                    lines.append(f'{metric}_bucket{_format_labels(labels + (("le", bound),))} {bucket_count}')
+                lines.append(f'{metric}_bucket{_format_labels(labels + (("le", "+Inf"),))} {count}')
+            lines.append(f'{metric}_sum{_format_labels(labels)} {total}')
+            lines.append(f'{metric}_count{_format_labels(labels)} {count}')
+    return '\n'.join(lines) + '\n'
+
+def reset():
+    """Forget metrics of earlier runs (called when the server starts)."""
+    if os.path.isdir(METRICS_DIR):
+        for entry in os.scandir(METRICS_DIR):
+            if entry.name.endswith('.json'):
+                os.remove(entry.path)
+
+def init_app(server):
+    if not METRICS_ENABLED:
+        return
+
+    @server.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+        g.request_pid = os.getpid()
+
+    @server.after_request
+    def record_callback(response):
+        timing = g.pop('callback_timing', None)
+        if timing is not None:
+            response_bytes = None if response.is_streamed else response.calculate_content_length()
+            _finish(timing, g.request_started, request.content_length, response_bytes)
+        return response
+
+    @server.route('/metrics')
+    def metrics():
+        return Response(render(collect()), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,201 @@
+"""Build static dashboard reports from ticket exports, without the web app.
+
+Usage:
+    python report.py export-2026-01-05.csv export-2026-01-12.csv ... [--output-dir reports]
+
+Each export gets a directory with report.html (all ten charts and the three
+Insights tables), report.json (the same figures and tables as data) and the
+jira_tickets.csv and high_age_tickets.csv downloads; index.html links them
+all. Exports are processed in parallel, one per worker process (--workers),
+with the same parsing, aggregate cube and chart code as the dashboard, and
+share its DATASET_DIR: an export already parsed (by the app or an earlier
+run) is opened from disk instead of being parsed again.
+"""
+import argparse
+import html
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+import plotly.io as pio
+from plotly.utils import PlotlyJSONEncoder
+
+from aggregates import (
+    HIGH_AGE_COLUMNS, HIGH_AGE_HOURS, JIRA_TICKET_COLUMNS, TOP_CUSTOMER_COLUMNS, TOP_N_MODE, TOP_N_MODES, build_cube,
+    high_age_tickets, jira_tickets, merged_top_customers, resolve_as_of, resolve_date_range, rows_in_range,
+    slice_cube, total_jira_tickets)
+from figures import FIGURES
+from ingest import customer_summary, load_file
+
+
+# Insights tables: name -> (title, build(dataset, rows in range, settings), columns), where settings
+# holds the resolved 'start' and 'end' days, 'as_of', 'threshold_hours' and 'top_n_mode'
+TABLES = {
+    'high_age_tickets': ("High Ageing Tickets (Open > {threshold_hours:g} hours)",
+                         lambda dataset, df, settings: high_age_tickets(df, settings['as_of'],
+                                                                        settings['threshold_hours']),
+                         HIGH_AGE_COLUMNS),
+    'top_customers': ("Top Customers by Ticket Count (Email ID)",
+                      lambda dataset, df, settings: merged_top_customers(
+                          customer_summary(dataset, settings['top_n_mode']), settings['start'], settings['end']),
+                      TOP_CUSTOMER_COLUMNS),
+    'jira_tickets': ("Tickets with Jira Link", lambda dataset, df, settings: jira_tickets(df, settings['as_of']),
+                     JIRA_TICKET_COLUMNS),
+}
+# Tables written in full next to the report, as the dashboard's downloads
+CSV_TABLES = ['jira_tickets', 'high_age_tickets']
+
+PAGE_STYLE = """
+body { font-family: sans-serif; max-width: 1200px; margin: auto; padding: 20px; }
+table { border-collapse: collapse; margin-bottom: 20px; }
+th, td { border: 1px solid #ddd; padding: 4px 8px; text-align: left; }
+"""
+
+
+def build_report(dataset, start_date=None, end_date=None, as_of=None, threshold_hours=HIGH_AGE_HOURS,
+                 top_n_mode=TOP_N_MODE):
+    """Figures, Jira total and Insights tables of dataset, as the dashboard shows them."""
+    cube = dataset.derived('cube', build_cube)
+    start, end = resolve_date_range(start_date, end_date, cube)
+    range_cube = slice_cube(cube, start, end)
+    rows = rows_in_range(dataset.df, start, end)
+    settings = {'start': start, 'end': end, 'as_of': as_of, 'threshold_hours': threshold_hours,
+                'top_n_mode': top_n_mode}
+    return {
+        'start': start,
+        'end': end,
+        'figures': {graph_id: build_figure(range_cube) for graph_id, build_figure in FIGURES.items()},
+        'jira_total': total_jira_tickets(range_cube),
+        # Free text (titles) is only decoded for the rows the tables list
+        'tables': {name: dataset.with_columns(build(dataset, rows, settings), columns)
+                   for name, (_, build, columns) in TABLES.items()},
+    }
+
+def _date(value):
+    return value.strftime('%d-%m-%Y') if pd.notna(value) else ''
+
+def write_html(path, title, report, summary, table_rows, plotlyjs):
+    parts = [f"<h2>{html.escape(title)}</h2>", f"<p>{html.escape(summary)}</p>"]
+    for i, (graph_id, figure) in enumerate(report['figures'].items()):
+        if graph_id == 'jira-week-status-graph':
+            parts.append(f"<h4>Total Jira Tickets: {report['jira_total']}</h4>")
+        # plotly.js goes in once, with the first chart
+        parts.append(pio.to_html(figure, full_html=False, include_plotlyjs=plotlyjs if i == 0 else False))
+    for name, (table_title, _, _) in TABLES.items():
+        table = report['tables'][name]
+        parts.append(f"<h4>{html.escape(table_title.format(threshold_hours=report['threshold_hours']))}</h4>")
+        if len(table) > table_rows:
+            parts.append(f"<p>First {table_rows} of {len(table)} rows</p>")
+        parts.append(table.head(table_rows).to_html(index=False, na_rep=''))
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>{html.escape(title)}</title>"
+                f"<style>{PAGE_STYLE}</style></head><body>{''.join(parts)}</body></html>")
+
+def write_json(path, source, report, table_rows):
+    document = {
+        'source': source,
+        'start': _date(report['start']),
+        'end': _date(report['end']),
+        'as_of': report['as_of'].isoformat(),
+        'threshold_hours': report['threshold_hours'],
+        'jira_total': report['jira_total'],
+        'figures': {graph_id: figure.to_plotly_json() for graph_id, figure in report['figures'].items()},
+        'tables': {name: {'rows': len(table), 'records': json.loads(table.head(table_rows).to_json(orient='records'))}
+                   for name, table in report['tables'].items()},
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, cls=PlotlyJSONEncoder)
+
+def report_file(path, out_dir, options):
+    """Parse (or reopen) the export at path and write its report to out_dir; returns a summary dict."""
+    started = time.perf_counter()
+    dataset = load_file(path)
+    as_of = options['as_of']
+    report = build_report(dataset, options['start'], options['end'], as_of, options['threshold_hours'],
+                          options['top_n_mode'])
+    report.update(as_of=as_of, threshold_hours=options['threshold_hours'])
+
+    os.makedirs(out_dir, exist_ok=True)
+    name = os.path.basename(path)
+    summary = (f"{len(dataset.df)} tickets, {_date(report['start'])} to {_date(report['end'])}; "
+               f"ages as of {as_of:%d-%m-%Y %H:%M}")
+    write_html(os.path.join(out_dir, 'report.html'), f"Tech Support Dashboard: {name}", report, summary,
+               options['table_rows'], options['plotlyjs'])
+    write_json(os.path.join(out_dir, 'report.json'), name, report, options['table_rows'])
+    for table in CSV_TABLES:
+        report['tables'][table].to_csv(os.path.join(out_dir, f'{table}.csv'), index=False)
+    return {'source': path, 'out_dir': out_dir, 'summary': summary, 'seconds': time.perf_counter() - started}
+
+def output_dirs(paths, output_dir):
+    """One directory per export, named after the file (made unique)."""
+    dirs, seen = [], {}
+    for path in paths:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        seen[stem] = seen.get(stem, 0) + 1
+        dirs.append(os.path.join(output_dir, stem if seen[stem] == 1 else f'{stem}-{seen[stem]}'))
+    return dirs
+
+def write_index(path, results):
+    items = ''.join(
+        f"<li><a href=\"{html.escape(os.path.relpath(result['out_dir'], os.path.dirname(path)))}/report.html\">"
+        f"{html.escape(os.path.basename(result['source']))}</a>: {html.escape(result['summary'])}</li>"
+        for result in results)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>Reports</title>"
+                f"<style>{PAGE_STYLE}</style></head><body><h2>Reports</h2><ul>{items}</ul></body></html>")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('exports', nargs='+', help='CSV exports, one report each')
+    parser.add_argument('--output-dir', default='reports')
+    parser.add_argument('--workers', type=int, default=None, help='parallel processes (default: one per CPU)')
+    parser.add_argument('--start', help='first day of the date range, yyyy-mm-dd (default: first ticket)')
+    parser.add_argument('--end', help='last day of the date range, yyyy-mm-dd (default: last ticket)')
+    parser.add_argument('--as-of', help='measure ticket ages on this day, yyyy-mm-dd (default: now)')
+    parser.add_argument('--as-of-time', help='and at this time, HH:MM')
+    parser.add_argument('--high-age-hours', type=float, default=HIGH_AGE_HOURS)
+    parser.add_argument('--top-n-mode', choices=TOP_N_MODES, default=TOP_N_MODE,
+                        help='merge top customer counts from every (exact) or only the largest daily counts')
+    parser.add_argument('--table-rows', type=int, default=100, help='rows of each table in the HTML/JSON report')
+    parser.add_argument('--embed-plotlyjs', action='store_true',
+                        help='inline plotly.js in every report instead of loading it from a CDN')
+    args = parser.parse_args()
+
+    try:
+        # One reference time for every report of the run
+        as_of = resolve_as_of(args.as_of, args.as_of_time)
+    except ValueError as e:
+        parser.error(f"--as-of: {e}")
+    options = {
+        'start': args.start, 'end': args.end, 'as_of': as_of,
+        'threshold_hours': args.high_age_hours, 'top_n_mode': args.top_n_mode, 'table_rows': args.table_rows,
+        'plotlyjs': True if args.embed_plotlyjs else 'cdn',
+    }
+    dirs = output_dirs(args.exports, args.output_dir)
+    workers = min(args.workers or os.cpu_count() or 1, len(args.exports))
+    results, failed = {}, 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(report_file, path, out_dir, options): path
+                   for path, out_dir in zip(args.exports, dirs)}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                result = future.result()
+            except (OSError, KeyError, ValueError) as e:
+                failed += 1
+                print(f"{path}: could not build a report: {e}", file=sys.stderr)
+                continue
+            results[path] = result
+            print(f"{path}: {result['summary']} -> {result['out_dir']} ({result['seconds']:.1f}s)")
+
+    if results:
+        os.makedirs(args.output_dir, exist_ok=True)
+        write_index(os.path.join(args.output_dir, 'index.html'), [results[p] for p in args.exports if p in results])
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,47 @@
+import importlib.util
+import os
+
+from flask import request
+
+
+# Opt-in response compression (COMPRESS_RESPONSES=1) for the page, the Dash
+# bundles and callback responses, negotiated per request: brotli when the
+# browser accepts it, gzip otherwise. Needs flask-compress
+# (pip install "dash[compress]"); without it responses go out as they are.
+COMPRESSION_AVAILABLE = importlib.util.find_spec('flask_compress') is not None
+COMPRESSION_ENABLED = COMPRESSION_AVAILABLE and os.environ.get('COMPRESS_RESPONSES', '0') == '1'
+COMPRESS_ALGORITHMS = ['br', 'gzip']
+# Fast settings: callback responses are compressed on every request
+COMPRESS_LEVEL = 6
+COMPRESS_BR_LEVEL = 4
+# Below this a response is not worth compressing
+COMPRESS_MIN_BYTES = 1024
+
+# Dash serves its JavaScript bundles with a fingerprinted URL and a long
+# max-age but no validator; an ETag lets a reload revalidate them with a 304
+BUNDLE_PREFIX = '/_dash-component-suites/'
+
+
+def init_app(server):
+    if COMPRESSION_ENABLED:
+        from flask_compress import Compress
+        server.config.update(
+            COMPRESS_ALGORITHM=COMPRESS_ALGORITHMS,
+            COMPRESS_LEVEL=COMPRESS_LEVEL,
+            COMPRESS_BR_LEVEL=COMPRESS_BR_LEVEL,
+            COMPRESS_MIN_SIZE=COMPRESS_MIN_BYTES,
+            # Downloads are streamed and already offered as .csv.gz
+            COMPRESS_STREAMS=False,
+        )
+        Compress(server)
+
+    # Registered after Compress so it runs first: the compressor then marks
+    # the ETag with the encoding it chose
+    @server.after_request
+    def add_bundle_etag(response):
+        if (request.method in ('GET', 'HEAD') and request.path.startswith(BUNDLE_PREFIX)
+                and response.status_code == 200 and not response.direct_passthrough
+                and response.get_etag()[0] is None):
+            response.add_etag()
+            response.make_conditional(request)
+        return response
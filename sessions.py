@@ -0,0 +1,72 @@
+import os
+import re
+import time
+import uuid
+
+from datastore import DATASET_DIR
+
+
+# Browser sessions with a dataset open. Every page load gets a session id, and
+# a session holds a slot from the moment it opens a dataset until its page
+# has stopped sending heartbeats for SESSION_IDLE_SECONDS. Slots are files in
+# SESSION_DIR, so every worker counts the same sessions. With MAX_SESSIONS
+# set (see Dataset.memory_usage for what one costs), a session cannot open a
+# dataset while that many others hold a slot.
+MAX_SESSIONS = int(os.environ.get('MAX_SESSIONS', '0'))
+SESSION_DIR = os.path.join(DATASET_DIR, 'sessions')
+SESSION_IDLE_SECONDS = int(os.environ.get('SESSION_IDLE_SECONDS', '300'))
+# How often an open page reports that it is still there
+HEARTBEAT_SECONDS = 60
+
+
+def new_session_id():
+    return uuid.uuid4().hex
+
+def _session_path(session_id):
+    # Session ids come back from the browser, so only accept what new_session_id makes
+    if not isinstance(session_id, str) or not re.fullmatch(r'[0-9a-f]{32}', session_id):
+        return None
+    return os.path.join(SESSION_DIR, session_id)
+
+def _touch(path):
+    os.makedirs(SESSION_DIR, exist_ok=True)
+    with open(path, 'a'):
+        os.utime(path)
+
+def active_sessions():
+    """Number of sessions holding a slot; slots idle for too long are released."""
+    cutoff = time.time() - SESSION_IDLE_SECONDS
+    count = 0
+    try:
+        entries = list(os.scandir(SESSION_DIR))
+    except OSError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.stat().st_mtime >= cutoff:
+                count += 1
+            else:
+                os.remove(entry.path)
+        except OSError:
+            pass
+    return count
+
+def admit(session_id):
+    """Give session_id a slot (or keep its own); False when every slot is taken.
+
+    Two sessions admitted at the same moment by different workers can both
+    get the last slot, so the cap is approximate by at most the worker count.
+    """
+    path = _session_path(session_id)
+    if path is None:
+        return MAX_SESSIONS <= 0
+    if not os.path.exists(path) and MAX_SESSIONS > 0 and active_sessions() >= MAX_SESSIONS:
+        return False
+    _touch(path)
+    return True
+
+def keep_alive(session_id):
+    """Heartbeat of an open page: refresh its slot, if it holds one."""
+    path = _session_path(session_id)
+    if path is not None and os.path.exists(path):
+        _touch(path)
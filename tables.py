@@ -0,0 +1,121 @@
+import math
+import re
+
+import pandas as pd
+
+
+# Operators of the DataTable filter_query syntax: name -> its symbol, if any
+FILTER_OPERATORS = {
+    'ge': '>=', 'le': '<=', 'lt': '<', 'gt': '>', 'ne': '!=', 'eq': '=',
+    'contains': None, 'datestartswith': None,
+}
+_OPERATOR_NAMES = {symbol: name for name, symbol in FILTER_OPERATORS.items() if symbol}
+
+# A whole '{column} op value' clause; the operator must follow the column's
+# closing brace, so operator words inside a value are just part of the value
+_FILTER_CLAUSE = re.compile(
+    r'^\s*\{(?P<column>[^}]*)\}\s*'
+    r'(?P<operator>>=|<=|!=|<|>|=|(?:' + '|'.join(FILTER_OPERATORS) + r')(?=\s|$))'
+    r'\s*(?P<value>.*?)\s*$', re.S)
+
+
+def _parse_filter_part(filter_part):
+    # (column, op, value, text): value is a float for an unquoted number,
+    # text the value as typed, unquoted
+    match = _FILTER_CLAUSE.match(filter_part)
+    if match is None:
+        return None, None, None, None
+    name = match.group('column')
+    operator = _OPERATOR_NAMES.get(match.group('operator'), match.group('operator'))
+    value_part = match.group('value')
+    if not value_part:
+        return name, operator, '', ''
+    quote = value_part[0]
+    if quote == value_part[-1] and quote in ("'", '"', '`') and len(value_part) > 1:
+        text = value_part[1:-1].replace('\\' + quote, quote)
+        return name, operator, text, text
+    try:
+        return name, operator, float(value_part), value_part
+    except ValueError:
+        return name, operator, value_part, value_part
+
+def split_filter_part(filter_part):
+    """Split one '{column} op value' clause into (column, op, value)."""
+    return _parse_filter_part(filter_part)[:3]
+
+def filter_frame(df, filter_query):
+    if not filter_query:
+        return df
+    mask = pd.Series(True, index=df.index)
+    for part in filter_query.split(' && '):
+        column, operator, value, text = _parse_filter_part(part)
+        if column not in df:
+            continue
+        values = df[column]
+        numeric = pd.api.types.is_numeric_dtype(values) and isinstance(value, float)
+        if pd.api.types.is_datetime64_any_dtype(values) and operator not in ('contains', 'datestartswith'):
+            # Times compare as times (missing ones never match) when the value is one
+            moment = pd.to_datetime(text, errors='coerce')
+            if pd.notna(moment):
+                value, numeric = moment, True
+        if not numeric:
+            # Compare categoricals and text as plain strings, against the
+            # value as typed (an unquoted 99 is '99', not '99.0')
+            values = values.astype(str)
+            value = text
+        if operator == 'contains':
+            mask &= values.str.contains(value, case=False, regex=False)
+        elif operator == 'datestartswith':
+            mask &= values.str.startswith(value)
+        elif operator == 'eq':
+            mask &= values == value
+        elif operator == 'ne':
+            mask &= values != value
+        elif operator == 'lt':
+            mask &= values < value
+        elif operator == 'le':
+            mask &= values <= value
+        elif operator == 'gt':
+            mask &= values > value
+        elif operator == 'ge':
+            mask &= values >= value
+    return df[mask]
+
+def _sort_key(values):
+    # Categories are in the order they were first seen; sort by value instead
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.reorder_categories(values.cat.categories.sort_values(), ordered=True)
+    return values
+
+def sort_frame(df, sort_by):
+    sort_by = [col for col in (sort_by or []) if col['column_id'] in df]
+    if not sort_by:
+        return df
+    return df.sort_values(
+        [col['column_id'] for col in sort_by],
+        ascending=[col['direction'] == 'asc' for col in sort_by],
+        kind='stable', key=_sort_key)
+
+def query_columns(filter_query, sort_by):
+    """Columns a filter_query and sort_by refer to."""
+    columns = [col['column_id'] for col in sort_by or []]
+    for part in (filter_query or '').split(' && '):
+        column = split_filter_part(part)[0]
+        if column is not None:
+            columns.append(column)
+    return columns
+
+def page_of(df, page_current, page_size, finish=None):
+    """Records of one page plus the total page count.
+
+    finish, if given, adds columns to the page's rows only, e.g. values that
+    are too costly to compute for the whole frame. A page past the end (the
+    rows shrank under it) is read as the last page.
+    """
+    page_count = max(math.ceil(len(df) / page_size), 1)
+    page_current = min(page_current or 0, page_count - 1)
+    start = page_current * page_size
+    page = df.iloc[start:start + page_size]
+    if finish is not None:
+        page = finish(page)
+    return page.to_dict('records'), page_count
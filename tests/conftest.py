@@ -0,0 +1,69 @@
+import os
+import tempfile
+
+# Settings the app reads at import time: a private dataset directory, and
+# callbacks run inside the request rather than as background jobs
+os.environ.setdefault('DATASET_DIR', tempfile.mkdtemp(prefix='dashboard-tests-'))
+os.environ['BACKGROUND_CALLBACKS'] = '0'
+os.environ['METRICS_LOG'] = '0'
+
+import pandas as pd
+import pytest
+
+
+def make_tickets(n_rows):
+    """A small export in the helpdesk CSV layout: open tickets, one an hour from 01-01-2023."""
+    created = pd.Timestamp('2023-01-01') + pd.to_timedelta(range(n_rows), unit='h')
+    return pd.DataFrame({
+        'ticket_id': range(1, n_rows + 1),
+        'title': [f'Ticket {i}' for i in range(1, n_rows + 1)],
+        'created_at': created.strftime('%d-%m-%Y %H:%M'),
+        'ticket_status': 'Open',
+        'cf_tech_issue_category': 'Login',
+        'cf_cf_tech_issue_category_sub-category': 'Password',
+        'last_agent_assignment': [f'ID:{i % 3}||Name:Agent {i % 3}||Group:L1' for i in range(n_rows)],
+        'cf_is_tech_issue': 'Yes',
+        'cf_knowledge_gap': 'No',
+        'user_email': [f'user{i % 7}@example.com' for i in range(n_rows)],
+        'cf_jira_link': [f'https://jira.example.com/browse/TECH-{i}' if i % 2 else None for i in range(n_rows)],
+    })
+
+
+@pytest.fixture(scope='session')
+def dashboard():
+    import dashboard
+    return dashboard
+
+
+@pytest.fixture(scope='session')
+def dataset_key():
+    from ingest import load_upload
+    return load_upload(make_tickets(200).to_csv(index=False).encode('utf-8')).key
+
+
+@pytest.fixture
+def call_callback(dashboard):
+    """call(output, values, changed): response of the callback writing output ('id.property').
+
+    values maps (id, property) to the value sent, None for any other input
+    or state; changed is the (id, property) that triggered the call.
+    """
+    client = dashboard.app.server.test_client()
+
+    def call(output, values, changed):
+        output_key = next(key for key in dashboard.app.callback_map
+                          if output in key.strip('.').split('...'))
+        callback = dashboard.app.callback_map[output_key]
+        outputs = [dict(zip(('id', 'property'), out.rsplit('.', 1))) for out in output_key.strip('.').split('...')]
+        payload = {
+            'output': output_key,
+            'outputs': outputs if len(outputs) > 1 else outputs[0],
+            'inputs': [dict(dep, value=values.get((dep['id'], dep['property']))) for dep in callback['inputs']],
+            'state': [dict(dep, value=values.get((dep['id'], dep['property']))) for dep in callback['state']],
+            'changedPropIds': ['.'.join(changed)],
+        }
+        response = client.post('/_dash-update-component', json=payload)
+        assert response.status_code == 200, response.data
+        return response.json['response']
+
+    return call
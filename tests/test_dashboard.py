@@ -0,0 +1,61 @@
+import io
+
+import pandas as pd
+
+
+def insights_table(call_callback, key, page_current, filter_query, changed):
+    values = {
+        ('dashboard-tabs', 'value'): 'insights', ('high-age-table', 'page_current'): page_current,
+        ('high-age-table', 'page_size'): 10, ('high-age-table', 'sort_by'): [],
+        ('high-age-table', 'filter_query'): filter_query, ('cross-filter', 'data'): {},
+        ('dataset-key', 'data'): key,
+    }
+    return call_callback('high-age-table.data', values, changed)['high-age-table']
+
+
+def test_insights_table_back_to_first_page_when_filter_shrinks_it(call_callback, dataset_key):
+    table = insights_table(call_callback, dataset_key, 4, '', ('high-age-table', 'page_current'))
+    assert (table['page_count'], table['page_current'], len(table['data'])) == (20, 4, 10)
+
+    table = insights_table(call_callback, dataset_key, 4, '{ticket_id} < 15', ('high-age-table', 'filter_query'))
+    assert (table['page_count'], table['page_current']) == (2, 0)
+    assert [row['ticket_id'] for row in table['data']] == list(range(1, 11))
+
+
+def test_insights_table_page_past_the_end_shows_last_page(call_callback, dataset_key):
+    table = insights_table(call_callback, dataset_key, 4, '{ticket_id} < 15', ('high-age-table', 'page_current'))
+    assert (table['page_count'], table['page_current']) == (2, 1)
+    assert [row['ticket_id'] for row in table['data']] == list(range(11, 15))
+
+
+def filtered_table(call_callback, key, page_current, filter_query, changed):
+    values = {
+        ('cross-filter', 'data'): {'ticket_status': 'Open'}, ('filtered-data-table', 'page_current'): page_current,
+        ('filtered-data-table', 'page_size'): 10, ('filtered-data-table', 'sort_by'): [],
+        ('filtered-data-table', 'filter_query'): filter_query, ('dataset-key', 'data'): key,
+    }
+    return call_callback('filtered-data-table.data', values, changed)['filtered-data-table']
+
+
+def test_filtered_table_back_to_first_page_when_filter_shrinks_it(call_callback, dataset_key):
+    table = filtered_table(call_callback, dataset_key, 4, '{ticket_id} < 15', ('filtered-data-table', 'filter_query'))
+    assert (table['page_count'], table['page_current']) == (2, 0)
+    assert [row['ticket_id'] for row in table['data']] == list(range(1, 11))
+
+    table = filtered_table(call_callback, dataset_key, 4, '{ticket_id} < 15', ('filtered-data-table', 'page_current'))
+    assert (table['page_count'], table['page_current']) == (2, 1)
+    assert [row['ticket_id'] for row in table['data']] == list(range(11, 15))
+
+
+def test_filtered_download_link_carries_the_as_of_time(dashboard, call_callback, dataset_key):
+    values = {
+        ('cross-filter', 'data'): {'ticket_status': 'Open'}, ('as-of-date', 'date'): '2023-01-10',
+        ('as-of-time', 'value'): '12:00', ('high-age-hours', 'value'): 24, ('dataset-key', 'data'): dataset_key,
+    }
+    link = call_callback('download-link.children', values, ('as-of-date', 'date'))['download-link']['children']
+    href = link['props']['children'][0]['props']['href']
+    assert 'as_of=2023-01-10' in href and 'as_of_time=12%3A00' in href and 'hours=24' in href
+
+    download = pd.read_csv(io.BytesIO(dashboard.app.server.test_client().get(href).data))
+    # Ticket 1 was created on 01-01-2023 at midnight
+    assert download.loc[download['ticket_id'] == 1, 'age_hours'].tolist() == [228.0]
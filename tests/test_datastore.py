@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+
+import datastore
+from datastore import Dataset, DatasetStore
+
+
+def make_dataset(key):
+    return Dataset(key, pd.DataFrame({'ticket_id': np.arange(1000)}))
+
+
+def test_memo_bounded_by_bytes_and_counted_in_nbytes(monkeypatch):
+    monkeypatch.setattr(datastore, 'MEMO_MAX_BYTES', 20000)
+    dataset = make_dataset('a')
+    base = dataset.nbytes
+    for i in range(5):
+        dataset.memoized(('rows', i), lambda: pd.DataFrame({'x': np.zeros(1000)}))
+    # Each result is a little over 8000 bytes, so the last two are kept
+    assert 16000 < dataset.memory_usage()['memo'] <= 20000
+    assert dataset.memoized(('rows', 3), lambda: None) is not None
+    assert dataset.memoized(('rows', 2), lambda: 'computed again') == 'computed again'
+    assert dataset.nbytes == base + dataset.memory_usage()['memo']
+
+
+def test_store_evicts_when_a_cached_dataset_grows():
+    first, second = make_dataset('a'), make_dataset('b')
+    store = DatasetStore(max_bytes=first.nbytes + second.nbytes + 50000)
+    store.put(first)
+    store.put(second)
+    second.memoized('big', lambda: np.zeros(10000))
+    assert store.get('a') is None
+    assert store.get('b') is second
@@ -0,0 +1,25 @@
+import pandas as pd
+
+from tables import filter_frame, split_filter_part
+
+
+def test_split_filter_part_keeps_operator_words_in_values():
+    assert split_filter_part('{title} contains "storage issue"') == ('title', 'contains', 'storage issue')
+    assert split_filter_part('{agent_name} eq "George Lee"') == ('agent_name', 'eq', 'George Lee')
+    assert split_filter_part('{age_hours} >= 5') == ('age_hours', 'ge', 5.0)
+
+
+def test_text_column_filtered_by_unquoted_number():
+    df = pd.DataFrame({
+        'title': ['Error 99 on login', 'Timeout', 'Error 990'],
+        'cf_jira_link': pd.Categorical(['TECH-12', 'TECH-7', None]),
+    })
+    assert filter_frame(df, '{title} contains 99')['title'].tolist() == ['Error 99 on login', 'Error 990']
+    assert filter_frame(df, '{cf_jira_link} contains 12')['title'].tolist() == ['Error 99 on login']
+    assert filter_frame(df, '{title} contains "99"').equals(filter_frame(df, '{title} contains 99'))
+
+
+def test_numeric_column_filtered_by_number():
+    df = pd.DataFrame({'ticket_id': [5, 99, 120]})
+    assert filter_frame(df, '{ticket_id} > 99')['ticket_id'].tolist() == [120]
+    assert filter_frame(df, '{ticket_id} eq 99')['ticket_id'].tolist() == [99]
@@ -0,0 +1,99 @@
+import os
+import re
+import tempfile
+import time
+
+from flask import abort, jsonify, request
+
+from datastore import DATASET_DIR, content_key, file_content_key, is_valid_key
+
+
+# Uploaded exports wait here until they are ingested: partial uploads under
+# their browser-chosen id, complete ones under their content key (staged)
+UPLOAD_DIR = os.path.join(DATASET_DIR, 'uploads')
+# Unfinished uploads older than this are removed when a new one starts
+UPLOAD_TTL_SECONDS = int(os.environ.get('UPLOAD_TTL_SECONDS', '86400'))
+# Bytes copied from the request body to disk at a time
+COPY_BLOCK_BYTES = 1024 * 1024
+
+
+def _upload_path(upload_id):
+    # Upload ids are chosen by the browser, so keep them to a safe alphabet
+    if not re.fullmatch(r'[A-Za-z0-9_-]{8,128}', upload_id):
+        abort(404)
+    return os.path.join(UPLOAD_DIR, f'{upload_id}.part')
+
+def _received(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+def _remove_stale_uploads():
+    cutoff = time.time() - UPLOAD_TTL_SECONDS
+    for entry in os.scandir(UPLOAD_DIR):
+        try:
+            if entry.name.endswith(('.part', '.csv')) and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+def staged_path(key):
+    """Where a complete upload with content key waits to be ingested."""
+    if not is_valid_key(key):
+        raise ValueError(f"invalid dataset key: {key!r}")
+    return os.path.join(UPLOAD_DIR, f'{key}.csv')
+
+def stage_upload(raw):
+    """Write an upload received in one piece to disk and return its key."""
+    key = content_key(raw)
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    _remove_stale_uploads()
+    fd, tmp_path = tempfile.mkstemp(prefix='.stage-', dir=UPLOAD_DIR)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(raw)
+    os.replace(tmp_path, staged_path(key))
+    return key
+
+def discard_staged(key):
+    try:
+        os.remove(staged_path(key))
+    except OSError:
+        pass
+
+def init_app(server):
+    """Register the resumable upload routes used by assets/chunked_upload.js.
+
+    GET  /upload/<id>            -> {"received": bytes already stored}
+    PUT  /upload/<id>?offset=N   -> append the request body at byte N
+    POST /upload/<id>/complete   -> stage the file for ingestion, {"key": content key}
+    """
+    @server.route('/upload/<upload_id>', methods=['GET'])
+    def upload_status(upload_id):
+        return jsonify(received=_received(_upload_path(upload_id)))
+
+    @server.route('/upload/<upload_id>', methods=['PUT'])
+    def upload_chunk(upload_id):
+        path = _upload_path(upload_id)
+        offset = request.args.get('offset', type=int)
+        received = _received(path)
+        if offset is None or offset != received:
+            # Tell the client where to resume from
+            return jsonify(received=received), 409
+        if offset == 0:
+            os.makedirs(UPLOAD_DIR, exist_ok=True)
+            _remove_stale_uploads()
+        with open(path, 'ab') as f:
+            for block in iter(lambda: request.stream.read(COPY_BLOCK_BYTES), b''):
+                f.write(block)
+        return jsonify(received=_received(path))
+
+    @server.route('/upload/<upload_id>/complete', methods=['POST'])
+    def upload_complete(upload_id):
+        path = _upload_path(upload_id)
+        if not os.path.exists(path):
+            abort(404)
+        # Parsing happens in the dashboard's upload callback, which reports progress
+        key = file_content_key(path)
+        os.replace(path, staged_path(key))
+        return jsonify(key=key)